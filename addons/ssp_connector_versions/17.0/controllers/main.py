@@ -1,6 +1,14 @@
 # -*- coding: utf-8 -*-
+import json
+import logging
+
 from odoo import http
 from odoo.http import request
+from odoo.tools import consteq
+
+from ..tools import ssp_results
+
+_logger = logging.getLogger(__name__)
 
 class SspController(http.Controller):
     
@@ -8,17 +16,69 @@ class SspController(http.Controller):
     def ssp_dashboard(self, **kwargs):
         """Redirects to SSP with SSO in a new tab"""
         
-        # Search for configuration
-        config = request.env['ssp.config'].sudo().get_config()
+        # Cached per worker, no query once warm
+        config = request.env['ssp.config'].sudo()._get_config_values(request.env.company.id)
         
         if not config:
             return request.render('ssp_connector.ssp_no_config')
         
-        if not config.api_key:
+        if not config['api_key']:
             return request.render('ssp_connector.ssp_no_token')
         
         # URL SSO com token
-        sso_url = f"{config.platform_url}/sso/odoo?token={config.api_key}"
+        sso_url = request.env['ssp.config']._get_sso_url(config)
         
         # Redirecionar direto
-        return request.redirect(sso_url)
+        return request.redirect(sso_url, local=False)
+    
+    @http.route('/ssp_connector/results', type='http', auth='public', methods=['POST'], csrf=False, save_session=False)
+    def ssp_results(self, **kwargs):
+        """Receives a batch of extraction results pushed by SSP"""
+        
+        config = self._get_platform_config()
+        if not config:
+            return request.make_json_response({'error': 'invalid token'}, status=401)
+        
+        try:
+            results = json.loads(request.httprequest.get_data())['results']
+        except (ValueError, KeyError, TypeError):
+            return request.make_json_response({'error': 'invalid payload'}, status=400)
+        if not isinstance(results, list):
+            return request.make_json_response({'error': 'results must be a list'}, status=400)
+        
+        valid = [result for result in map(ssp_results.clean, results) if result]
+        if len(valid) < len(results):
+            _logger.warning(f'SSP pushed {len(results) - len(valid)} malformed extraction result(s), ignored')
+        
+        applied = request.env['account.move'].sudo().with_company(config.company_id)._ssp_apply_results(config, valid)
+        _logger.info(f'SSP pushed {len(results)} extraction result(s), {len(applied)} applied')
+        
+        return request.make_json_response({
+            'applied': applied.ids,
+            'skipped': sorted({r['move_id'] for r in valid if r['move_id']} - set(applied.ids)),
+            'invalid': len(results) - len(valid),
+        })
+    
+    @http.route('/ssp_connector/metrics', type='http', auth='public', methods=['GET'], csrf=False, save_session=False)
+    def ssp_metrics(self, **kwargs):
+        """Prometheus scrape endpoint, enabled by the ssp_connector.metrics_token parameter"""
+        
+        expected = request.env['ir.config_parameter'].sudo().get_param('ssp_connector.metrics_token')
+        if not expected:
+            return request.not_found()
+        scheme, _sep, token = request.httprequest.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not consteq(token, expected):
+            return request.make_response('unauthorized\n', headers=[('Content-Type', 'text/plain')], status=401)
+        
+        body = request.env['ssp.metric'].sudo()._ssp_render()
+        return request.make_response(body, headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
+    
+    def _get_platform_config(self):
+        """Returns the ssp.config whose Communication Token is sent as bearer token"""
+        scheme, _sep, token = request.httprequest.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return None
+        config = request.env['ssp.config'].sudo().search([('odoo_api_key', '=', token)], limit=1)
+        if config and consteq(config.odoo_api_key, token):
+            return config
+        return None
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, Command, _
+from odoo.exceptions import UserError
+import logging
+
+from ..tools import image_prep, metrics, ssp_results
+
+_logger = logging.getLogger(__name__)
+
+SSP_MOVE_TYPES = ('in_invoice', 'in_refund')
+
+# Submissions of more bills than this are queued as backfill, behind interactive ones
+SSP_INTERACTIVE_MAX_MOVES = 50
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    ssp_state = fields.Selection([
+        ('queued', 'Queued'),
+        ('submitted', 'Submitted'),
+        ('done', 'Processed'),
+        ('error', 'Error')
+    ], string='SSP Status', copy=False, readonly=True, index='btree_not_null')
+
+    ssp_document_ref = fields.Char(
+        string='SSP Document',
+        copy=False,
+        readonly=True,
+        index='btree_not_null',
+        help='Document reference returned by Smart Solutions Platform'
+    )
+
+    ssp_confidence = fields.Float(
+        string='SSP Confidence',
+        copy=False,
+        readonly=True,
+        index='btree_not_null',
+        help='Confidence of the extraction reported by Smart Solutions Platform, from 0 to 1'
+    )
+
+    ssp_submitted_at = fields.Datetime(
+        string='Sent to SSP',
+        copy=False,
+        readonly=True,
+        index='btree_not_null'
+    )
+
+    # The SSP columns are only set on the few moves ever sent to the
+    # platform: partial indexes keep them small on large move tables.
+
+    def action_ssp_submit(self):
+        """List action: queue the selected vendor bills for SSP processing"""
+        queued = self._ssp_submit()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Smart Solutions Platform'),
+                'message': _('%s vendor bill(s) queued for processing.', len(queued)),
+                'type': 'success',
+                'sticky': False,
+            }
+        }
+
+    def _ssp_submit(self, batch_size=None, priority=None):
+        """Queues draft vendor bills for upload to SSP in batched requests
+
+        Bills are grouped per company and split in chunks of ``batch_size``
+        (defaults to the company configuration); each chunk becomes one
+        outbox message, i.e. one multipart request to the platform.
+        Large submissions default to the backfill ``priority`` so they do
+        not delay the bills users send one at a time.
+        Returns the bills that were queued.
+        """
+        moves = self.filtered(lambda m: m.move_type in SSP_MOVE_TYPES and m.state == 'draft')
+        if not priority:
+            priority = 'backfill' if len(moves) > SSP_INTERACTIVE_MAX_MOVES else 'interactive'
+        Config = self.env['ssp.config'].sudo()
+        Outbox = self.env['ssp.outbox']
+        for company, company_moves in moves.grouped('company_id').items():
+            values = Config._get_config_values(company.id)
+            if not values:
+                raise UserError(_('Smart Solutions Platform is not configured for %s.', company.name))
+            config = Config.browse(values['id'])
+
+            # Documents SSP already knows are never uploaded again
+            documents = company_moves._ssp_get_documents()
+            new_documents = company_moves._ssp_reuse_known_documents(config, documents)
+            to_send = company_moves.filtered(lambda m: m in new_documents or m not in documents)
+
+            size = batch_size or config.submit_batch_size or 1
+            ids = to_send.ids
+            Outbox._enqueue_many(config, 'submit', [
+                {'move_ids': ids[i:i + size]} for i in range(0, len(ids), size)
+            ], priority=priority)
+            to_send.write({'ssp_state': 'queued', 'ssp_submitted_at': fields.Datetime.now()})
+        return moves
+
+    def _ssp_get_documents(self):
+        """Returns {move: attachment} with the PDF or image to send for each bill"""
+        documents = {move: move.message_main_attachment_id for move in self if move.message_main_attachment_id}
+        missing = self.filtered(lambda m: m not in documents)
+        if missing:
+            attachments = self.env['ir.attachment'].sudo().search([
+                ('res_model', '=', 'account.move'),
+                ('res_id', 'in', missing.ids),
+                ('mimetype', 'in', ['application/pdf'] + sorted(image_prep.MIMETYPES)),
+            ], order='id')
+            for attachment in attachments:
+                move = self.browse(attachment.res_id)
+                documents.setdefault(move, attachment)
+        return documents
+
+    def _ssp_reuse_known_documents(self, config, documents):
+        """Serves bills whose file was already submitted from the extraction cache
+
+        ``documents`` maps bills to their attachment. Bills whose checksum is
+        processed get the stored result applied right away; bills whose
+        checksum is still being processed wait for the same SSP document.
+        Returns the remaining {move: attachment} that SSP has never seen.
+        """
+        Document = self.env['ssp.document']
+        known = Document._ssp_lookup(config.company_id, [a.checksum for a in documents.values()])
+        # Processed documents whose result was evicted from the cache are sent again
+        cached = Document._ssp_cached_results(known.values())
+        known = {
+            checksum: document for checksum, document in known.items()
+            if document.state != 'done' or document in cached
+        }
+        hits = sum(1 for attachment in documents.values() if attachment.checksum in known)
+        if hits:
+            metrics.inc('ssp_cache_requests_total', hits, cache='document', result='hit')
+        if len(documents) > hits:
+            metrics.inc('ssp_cache_requests_total', len(documents) - hits, cache='document', result='miss')
+        if not known:
+            return documents
+        remaining = {}
+        reused = []
+        waiting = {}
+        for move, attachment in documents.items():
+            document = known.get(attachment.checksum)
+            if not document:
+                remaining[move] = attachment
+            elif document in cached:
+                reused.append(dict(cached[document], move_id=move.id, document_id=document.document_ref))
+            else:
+                waiting.setdefault(document.document_ref, self.browse())
+                waiting[document.document_ref] |= move
+        for document_ref, moves in waiting.items():
+            moves.write({
+                'ssp_state': 'submitted',
+                'ssp_document_ref': document_ref,
+                'ssp_submitted_at': fields.Datetime.now(),
+            })
+        if reused:
+            self.sudo().with_company(config.company_id)._ssp_apply_results(config, reused)
+        return remaining
+
+    @api.model
+    def _ssp_apply_results(self, config, results):
+        """Applies a batch of SSP extraction results to their draft vendor bills
+
+        Everything the batch references (bills, partners, taxes, currencies)
+        is fetched with one query per model, bills getting the same header
+        values are written together, and the invoice lines of the whole
+        batch are created with a single ``create``. Malformed entries are
+        skipped (see tools/ssp_results.py).
+        Returns the bills that were updated.
+        """
+        results = [result for result in map(ssp_results.clean, results) if result]
+        self.env['ssp.document']._ssp_store_results(config.company_id, results)
+        results = {r['move_id']: r for r in results if r.get('move_id')}
+
+        # Bills sharing the same file wait on the same SSP document
+        by_ref = {r['document_id']: r for r in results.values() if r.get('document_id')}
+        if by_ref:
+            for move in self.search([
+                ('company_id', '=', config.company_id.id),
+                ('ssp_state', '=', 'submitted'),
+                ('ssp_document_ref', 'in', list(by_ref)),
+                ('id', 'not in', list(results)),
+            ]):
+                results[move.id] = dict(by_ref[move.ssp_document_ref], move_id=move.id)
+
+        moves = self.browse(list(results)).exists().filtered(
+            lambda m: m.company_id == config.company_id and m.move_type in SSP_MOVE_TYPES and m.state == 'draft'
+        )
+        if not moves:
+            return moves
+
+        partners = dict(zip(moves, self._ssp_prefetch_partners(config.company_id, [
+            results[move.id]['invoice']['partner'] for move in moves
+        ])))
+        taxes = self._ssp_prefetch_taxes(config.company_id, {
+            tax['amount']
+            for move in moves
+            for line in results[move.id]['lines']
+            for tax in line['taxes']
+        })
+        currency_names = {results[move.id]['invoice']['currency'] for move in moves} - {None}
+        currencies = {
+            c.name: c for c in self.env['res.currency'].with_context(active_test=False).search([('name', 'in', list(currency_names))])
+        }
+
+        line_vals_list = []
+        by_vals = {}
+        now = fields.Datetime.now()
+        for move in moves:
+            result = results[move.id]
+            invoice = result['invoice']
+            partner = partners[move]
+            vals = {}
+            if result['document_id'] and result['document_id'] != move.ssp_document_ref:
+                vals['ssp_document_ref'] = result['document_id']
+            if result['confidence'] is not None:
+                vals['ssp_confidence'] = result['confidence']
+            if not move.ssp_submitted_at:
+                vals['ssp_submitted_at'] = now
+            if partner and not move.partner_id:
+                vals['partner_id'] = partner.id
+            if invoice.get('ref') and not move.ref:
+                vals['ref'] = invoice['ref']
+            if invoice.get('invoice_date') and not move.invoice_date:
+                vals['invoice_date'] = invoice['invoice_date']
+            if invoice.get('invoice_date_due'):
+                vals['invoice_date_due'] = invoice['invoice_date_due']
+            currency = currencies.get(invoice.get('currency'))
+            if currency and not move.invoice_line_ids:
+                vals['currency_id'] = currency.id
+            key = tuple(sorted(vals.items()))
+            by_vals[key] = by_vals.get(key, self.browse()) | move
+
+            # Lines are only proposed on bills nobody started encoding
+            if move.invoice_line_ids:
+                continue
+            for line in result['lines']:
+                line_taxes = [taxes[t['amount']] for t in line['taxes'] if t['amount'] in taxes]
+                line_vals_list.append({
+                    'move_id': move.id,
+                    'display_type': 'product',
+                    'name': line['name'] or '/',
+                    'quantity': line['quantity'],
+                    'price_unit': line['price_unit'],
+                    'tax_ids': [Command.set([t.id for t in line_taxes])],
+                })
+
+        # One write per distinct set of header values
+        moves.write({'ssp_state': 'done'})
+        for key, group in by_vals.items():
+            if key:
+                group.write(dict(key))
+        if line_vals_list:
+            self.env['account.move.line'].create(line_vals_list)
+        moves._ssp_notify_updated()
+        return moves
+
+    def _ssp_notify_updated(self):
+        """Tells the users concerned by these bills that SSP updated them
+
+        Sent once per user for the whole recordset, i.e. per result batch:
+        open bill forms and lists reload themselves instead of being polled.
+        The bus delivers the notifications when the transaction commits.
+        """
+        by_user = {}
+        for move in self:
+            for user in move.create_uid | move.invoice_user_id:
+                by_user.setdefault(user, []).append(move.id)
+        notifications = [
+            (user.partner_id, 'ssp_connector/bills_updated', {'move_ids': move_ids})
+            for user, move_ids in by_user.items() if user.active and not user.share
+        ]
+        if notifications:
+            self.env['bus.bus']._sendmany(notifications)
+
+    @api.model
+    def _ssp_prefetch_partners(self, company, partner_data):
+        """Returns the supplier matched for each extracted partner of a result batch
+
+        Matching goes through the normalized VAT / IBAN / name keys of
+        ssp.partner.key, in one query for the whole batch.
+        """
+        return self.env['ssp.partner.key']._ssp_match(company, partner_data)
+
+    @api.model
+    def _ssp_prefetch_taxes(self, company, amounts):
+        """Returns {amount: tax} of the purchase taxes used by a result batch, in one query"""
+        if not amounts:
+            return {}
+        taxes = {}
+        for tax in self.env['account.tax'].search([
+            ('company_id', '=', company.id),
+            ('type_tax_use', '=', 'purchase'),
+            ('amount_type', '=', 'percent'),
+            ('amount', 'in', list(amounts)),
+        ], order='sequence, id'):
+            taxes.setdefault(tax.amount, tax)
+        return taxes
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+# Fields the supplier matching keys are computed from
+SSP_KEY_FIELDS = {'name', 'vat', 'company_id', 'active', 'parent_id'}
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partners = super(ResPartner, self).create(vals_list)
+        self.env['ssp.partner.key']._ssp_refresh(partners)
+        return partners
+
+    def write(self, vals):
+        res = super(ResPartner, self).write(vals)
+        if SSP_KEY_FIELDS.intersection(vals):
+            self.env['ssp.partner.key']._ssp_refresh(self)
+        return res
+
+
+class ResPartnerBank(models.Model):
+    _inherit = 'res.partner.bank'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        banks = super(ResPartnerBank, self).create(vals_list)
+        self.env['ssp.partner.key']._ssp_refresh(banks.partner_id)
+        return banks
+
+    def write(self, vals):
+        partners = self.partner_id
+        res = super(ResPartnerBank, self).write(vals)
+        if {'acc_number', 'partner_id', 'active'}.intersection(vals):
+            self.env['ssp.partner.key']._ssp_refresh(partners | self.partner_id)
+        return res
+
+    def unlink(self):
+        partners = self.partner_id
+        res = super(ResPartnerBank, self).unlink()
+        self.env['ssp.partner.key']._ssp_refresh(partners)
+        return res
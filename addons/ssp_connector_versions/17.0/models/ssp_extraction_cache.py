@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+import json
+import logging
+import zlib
+
+_logger = logging.getLogger(__name__)
+
+# Defaults of the eviction limits, overridable with the
+# ssp_connector.extraction_cache_max_mb / _max_days system parameters
+MAX_SIZE_MB = 512
+MAX_AGE_DAYS = 180
+# last_used is only refreshed when older than this, so hits stay read-only
+TOUCH_INTERVAL = '1 day'
+
+
+class SspExtractionCache(models.Model):
+    _name = 'ssp.extraction.cache'
+    _description = 'SSP Extraction Result Cache'
+    _rec_name = 'checksum'
+    _order = 'last_used desc, id desc'
+    _log_access = False
+
+    checksum = fields.Char(
+        string='Checksum',
+        required=True,
+        readonly=True,
+        help='SHA1 of the file content, as stored on ir.attachment'
+    )
+
+    model_version = fields.Char(
+        string='Model Version',
+        required=True,
+        readonly=True,
+        default='',
+        help='Version of the SSP extraction model that produced the result'
+    )
+
+    data = fields.Binary(
+        string='Compressed Result',
+        attachment=False,
+        readonly=True,
+        prefetch=False,
+        help='zlib-compressed JSON of the extraction result'
+    )
+
+    size = fields.Integer(string='Size (bytes)', readonly=True)
+    last_used = fields.Datetime(string='Last Used', readonly=True, index=True)
+
+    # The unique index also serves the checksum lookups
+    _sql_constraints = [
+        ('checksum_version_unique', 'unique(checksum, model_version)',
+         'An extraction result is cached once per file and model version!')
+    ]
+
+    @api.model
+    def _ssp_get_many(self, checksums):
+        """Returns {checksum: result} for the cached checksums, newest model version first"""
+        checksums = [c for c in set(checksums) if c]
+        if not checksums:
+            return {}
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (checksum) id, checksum, data
+              FROM ssp_extraction_cache
+             WHERE checksum = ANY(%s)
+          ORDER BY checksum, id DESC
+        """, [checksums])
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return {}
+        self.env.cr.execute("""
+            UPDATE ssp_extraction_cache SET last_used = now() at time zone 'UTC'
+             WHERE id = ANY(%s) AND last_used < now() at time zone 'UTC' - interval %s
+        """, [[row[0] for row in rows], TOUCH_INTERVAL])
+        return {checksum: json.loads(zlib.decompress(bytes(data))) for _id, checksum, data in rows}
+
+    @api.model
+    def _ssp_put_many(self, results_by_checksum):
+        """Stores {checksum: result}, replacing the entry of the same model version"""
+        rows = []
+        for checksum, result in results_by_checksum.items():
+            if not checksum:
+                continue
+            data = zlib.compress(json.dumps(result, separators=(',', ':')).encode(), 6)
+            rows.append((checksum, result.get('model_version') or '', data, len(data)))
+        if not rows:
+            return
+        self.env.cr.execute(f"""
+            INSERT INTO ssp_extraction_cache (checksum, model_version, data, size, last_used)
+            VALUES {', '.join(["(%s, %s, %s, %s, now() at time zone 'UTC')"] * len(rows))}
+            ON CONFLICT (checksum, model_version) DO UPDATE
+               SET data = EXCLUDED.data, size = EXCLUDED.size, last_used = EXCLUDED.last_used
+        """, [value for row in rows for value in row])
+        self.invalidate_model()
+
+    @api.model
+    def _cron_evict(self):
+        """Drops entries unused for too long, then the least recently used ones above the size limit"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        max_days = int(ICP.get_param('ssp_connector.extraction_cache_max_days', MAX_AGE_DAYS))
+        max_bytes = int(ICP.get_param('ssp_connector.extraction_cache_max_mb', MAX_SIZE_MB)) * 1024 * 1024
+        self.env.cr.execute("""
+            DELETE FROM ssp_extraction_cache
+             WHERE last_used < now() at time zone 'UTC' - make_interval(days => %s)
+        """, [max_days])
+        expired = self.env.cr.rowcount
+        self.env.cr.execute("""
+            DELETE FROM ssp_extraction_cache
+             WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, sum(size) OVER (ORDER BY last_used DESC, id DESC) AS total
+                      FROM ssp_extraction_cache
+                ) ranked
+                 WHERE total > %s
+             )
+        """, [max_bytes])
+        oversize = self.env.cr.rowcount
+        if expired or oversize:
+            _logger.info(f'SSP extraction cache: evicted {expired} expired and {oversize} oversize entries')
+        self.invalidate_model()
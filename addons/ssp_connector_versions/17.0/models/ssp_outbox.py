@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import config
+from datetime import timedelta
+import logging
+import random
+import time
+import uuid
+
+from ..tools.ssp_client import SspCircuitOpenError, SspPermanentError, SspThrottledError
+
+_logger = logging.getLogger(__name__)
+
+# Retry schedule: RETRY_BASE * 2^attempts seconds, capped at RETRY_MAX
+RETRY_BASE = 30
+RETRY_MAX = 6 * 3600
+MAX_ATTEMPTS = 10
+
+# Jobs left 'running' longer than this are considered orphaned by a dead worker
+STALE_AFTER = timedelta(minutes=15)
+
+# Days sent messages are kept for inspection; failed ones stay longer for support
+DONE_RETENTION_DAYS = 7
+FAILED_RETENTION_DAYS = 30
+
+BATCH_SIZE = 50
+# Share of each claim per priority tier: 4 interactive messages for 1 backfill one
+PRIORITY_WEIGHTS = {'interactive': 4, 'backfill': 1}
+# Backfill messages claimed at once, so a new interactive message never waits
+# behind more than this many bulk uploads of the running cron
+BACKFILL_CLAIM = 5
+# Share of the cron worker time limit spent draining; the rest is margin for
+# the message in flight. The cron re-triggers itself when work is left.
+TIME_BUDGET_SHARE = 0.5
+# Budget when no cron time limit applies
+TIME_BUDGET_MAX = 240
+
+
+class SspOutbox(models.Model):
+    _name = 'ssp.outbox'
+    _description = 'SSP Outbox Message'
+    _order = 'id desc'
+    _rec_name = 'idempotency_key'
+
+    config_id = fields.Many2one(
+        'ssp.config',
+        string='Configuration',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    company_id = fields.Many2one(
+        related='config_id.company_id',
+        store=True
+    )
+
+    operation = fields.Selection([
+        ('register', 'Registration'),
+        ('submit', 'Document Submission'),
+        ('sync', 'Synchronization'),
+    ], string='Operation', required=True, readonly=True)
+
+    priority = fields.Selection([
+        ('interactive', 'Interactive'),
+        ('backfill', 'Backfill')
+    ], string='Priority', default='interactive', required=True, readonly=True,
+        help='Interactive messages get most of the delivery capacity; '
+             'backfill messages (bulk submissions, synchronization) use the rest')
+
+    payload = fields.Json(
+        string='Payload',
+        readonly=True
+    )
+
+    idempotency_key = fields.Char(
+        string='Idempotency Key',
+        required=True,
+        readonly=True,
+        copy=False,
+        default=lambda self: str(uuid.uuid4()),
+        help='Sent as Idempotency-Key header so retried calls are applied once on SSP'
+    )
+
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], string='Status', default='pending', required=True, readonly=True, index=True)
+
+    attempts = fields.Integer(
+        string='Attempts',
+        readonly=True
+    )
+
+    next_attempt = fields.Datetime(
+        string='Next Attempt',
+        default=fields.Datetime.now,
+        readonly=True,
+        index=True
+    )
+
+    done_date = fields.Datetime(
+        string='Completed On',
+        readonly=True
+    )
+
+    last_error = fields.Text(
+        string='Last Error',
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('idempotency_key_unique', 'unique(idempotency_key)',
+         'The idempotency key of an SSP outbox message must be unique!')
+    ]
+
+    @api.model
+    def _enqueue(self, config, operation, payload=None, priority='interactive'):
+        """Queues a platform call; it is sent once the current transaction commits"""
+        job = self.sudo().create({
+            'config_id': config.id,
+            'operation': operation,
+            'payload': payload,
+            'priority': priority,
+        })
+        self._trigger_cron()
+        return job
+
+    @api.model
+    def _enqueue_many(self, config, operation, payloads, priority='interactive'):
+        """Queues one message per payload with a single INSERT"""
+        jobs = self.sudo().create([{
+            'config_id': config.id,
+            'operation': operation,
+            'payload': payload,
+            'priority': priority,
+        } for payload in payloads])
+        if jobs:
+            self._trigger_cron()
+        return jobs
+
+    @api.model
+    def _trigger_cron(self, at=None):
+        cron = self.env.ref('ssp_connector.ir_cron_ssp_outbox', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(at)
+
+    @api.model
+    def _cron_time_budget(self):
+        """Returns the seconds a draining cron may run, well within the cron time limit"""
+        limit = config.get('limit_time_real_cron', -1)
+        if limit is None or limit < 0:
+            # -1: crons get the limit of HTTP workers
+            limit = config.get('limit_time_real') or 0
+        return min(limit * TIME_BUDGET_SHARE, TIME_BUDGET_MAX) if limit > 0 else TIME_BUDGET_MAX
+
+    @api.model
+    def _cron_process(self, batch_size=BATCH_SIZE):
+        """Drains due outbox messages in batches, committing after each one
+
+        The time budget is checked after every message: claimed messages
+        that were not sent in time go back to pending at once instead of
+        waiting STALE_AFTER for the requeue.
+        """
+        self._requeue_stale()
+        deadline = time.monotonic() + self._cron_time_budget()
+        while True:
+            jobs = self._claim(batch_size)
+            if not jobs:
+                return
+            processed = self.browse()
+            try:
+                for operation, operation_jobs in jobs.grouped('operation').items():
+                    if time.monotonic() >= deadline:
+                        break
+                    # Operations with a batch handler are sent as one concurrent fan-out
+                    batch_handler = getattr(self.env['ssp.config'], f'_ssp_outbox_{operation}_batch', None)
+                    if batch_handler and len(operation_jobs) > 1:
+                        operation_jobs._process_batch(batch_handler)
+                        self.env.cr.commit()
+                        processed |= operation_jobs
+                        continue
+                    for job in operation_jobs:
+                        if time.monotonic() >= deadline:
+                            break
+                        job._process()
+                        self.env.cr.commit()
+                        processed |= job
+            except SspCircuitOpenError as e:
+                # The platform is down: its whole backlog waits for the end of
+                # the cool-down at once, the other claimed messages go back
+                left = (jobs - processed).filtered(lambda job: job.state == 'running')
+                held = left.filtered(lambda job: job.config_id.platform_url == e.platform_url)
+                held._hold_platform(e.retry_in)
+                (left - held).write({'state': 'pending'})
+                self.env.cr.commit()
+                continue
+            if time.monotonic() >= deadline:
+                break
+        # Time budget exhausted with work left: release it and run again right away
+        (jobs - processed).write({'state': 'pending'})
+        self.env.cr.commit()
+        self._trigger_cron()
+
+    @api.model
+    def _claim(self, limit):
+        """Locks a batch of due messages and flags them as running
+
+        Messages are served in weighted fair order: within a tier companies
+        take turns (the n-th message of every company before the n+1-th of
+        any), and the tiers are interleaved by PRIORITY_WEIGHTS, the unused
+        share of a tier going to the other one. At most BACKFILL_CLAIM
+        backfill messages are taken per claim.
+        """
+        weights = list(PRIORITY_WEIGHTS.items())
+        self.env.cr.execute("""
+            SELECT o.id
+              FROM ssp_outbox o
+              JOIN (
+                SELECT id, priority, row_number() OVER (PARTITION BY priority ORDER BY company_turn, next_attempt, id) AS tier_turn
+                  FROM (
+                    SELECT id, priority, next_attempt,
+                           row_number() OVER (PARTITION BY priority, company_id ORDER BY next_attempt, id) AS company_turn
+                      FROM ssp_outbox
+                     WHERE state = 'pending' AND next_attempt <= (now() at time zone 'UTC')
+                  ) by_company
+              ) ranked ON ranked.id = o.id
+              JOIN unnest(%s::varchar[], %s::int[]) AS weight(priority, value) ON weight.priority = ranked.priority
+             WHERE ranked.priority != 'backfill' OR ranked.tier_turn <= %s
+             ORDER BY ranked.tier_turn::float / weight.value, weight.value DESC, o.id
+             LIMIT %s
+               FOR UPDATE OF o SKIP LOCKED
+        """, [[w[0] for w in weights], [w[1] for w in weights], BACKFILL_CLAIM, limit])
+        jobs = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if jobs:
+            jobs.write({'state': 'running'})
+            self.env.cr.commit()
+        return jobs
+
+    @api.autovacuum
+    def _gc_outbox(self):
+        """Deletes delivered and failed messages past their retention; payloads can be large"""
+        self.env.cr.execute("""
+            DELETE FROM ssp_outbox
+             WHERE (state = 'done' AND done_date < now() at time zone 'UTC' - make_interval(days => %s))
+                OR (state = 'failed' AND done_date < now() at time zone 'UTC' - make_interval(days => %s))
+        """, [DONE_RETENTION_DAYS, FAILED_RETENTION_DAYS])
+        if self.env.cr.rowcount:
+            _logger.info(f'SSP outbox: {self.env.cr.rowcount} old message(s) deleted')
+
+    @api.model
+    def _requeue_stale(self):
+        stale = self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - STALE_AFTER)
+        ])
+        if stale:
+            _logger.warning(f'Requeuing {len(stale)} orphaned SSP outbox messages')
+            stale.write({'state': 'pending'})
+
+    def _process(self):
+        """Sends one message through the config handler matching its operation
+
+        SspCircuitOpenError is raised to the caller, which holds the whole
+        backlog of the platform instead of this message alone.
+        """
+        self.ensure_one()
+        handler = getattr(self.config_id, f'_ssp_outbox_{self.operation}')
+        try:
+            with self.env.cr.savepoint():
+                handler(self)
+        except SspCircuitOpenError:
+            raise
+        except Exception as e:
+            self._handle_error(e)
+        else:
+            self._mark_done()
+
+    def _process_batch(self, batch_handler):
+        """Sends messages of one operation through its batch handler
+
+        The handler returns {job id: exception} for the messages that did not
+        succeed; the others are completed together. Messages refused by an
+        open circuit breaker are left to the caller, like in _process.
+        """
+        try:
+            with self.env.cr.savepoint():
+                errors = batch_handler(self)
+        except Exception as e:
+            errors = {job.id: e for job in self}
+        self.filtered(lambda job: job.id not in errors)._mark_done()
+        circuit_open = None
+        for job in self.filtered(lambda job: job.id in errors):
+            if isinstance(errors[job.id], SspCircuitOpenError):
+                circuit_open = errors[job.id]
+                continue
+            job._handle_error(errors[job.id])
+        if circuit_open:
+            raise circuit_open
+
+    def _mark_done(self):
+        for attempts, jobs in self.grouped('attempts').items():
+            jobs.write({
+                'state': 'done',
+                'attempts': attempts + 1,
+                'done_date': fields.Datetime.now(),
+                'last_error': False,
+            })
+
+    def _handle_error(self, error):
+        self.ensure_one()
+        if isinstance(error, (SspCircuitOpenError, SspThrottledError)):
+            self._hold(error.retry_in)
+        elif isinstance(error, SspPermanentError):
+            self._mark_failed(str(error))
+        else:
+            self._schedule_retry(str(error))
+
+    def _hold(self, delay):
+        """Postpones a message while the platform is down or throttled, without spending an attempt"""
+        self.ensure_one()
+        next_attempt = fields.Datetime.now() + timedelta(seconds=max(delay, 1))
+        self.write({
+            'state': 'pending',
+            'next_attempt': next_attempt,
+        })
+        self._trigger_cron(next_attempt)
+
+    def _hold_platform(self, delay):
+        """Postpones these messages and every due message of their platforms
+
+        One UPDATE and one cron trigger for the whole backlog while the
+        circuit breaker is open, instead of claiming and holding each
+        message again at every cool-down.
+        """
+        next_attempt = fields.Datetime.now() + timedelta(seconds=max(delay, 1))
+        self.flush_model()
+        self.env['ssp.config'].flush_model(['platform_url'])
+        self.env.cr.execute("""
+            UPDATE ssp_outbox o
+               SET state = 'pending', next_attempt = %s, write_date = now() at time zone 'UTC'
+              FROM ssp_config c
+             WHERE c.id = o.config_id
+               AND c.platform_url = ANY(%s)
+               AND (o.id = ANY(%s) OR (o.state = 'pending' AND o.next_attempt < %s))
+        """, [next_attempt, list(set(self.mapped('config_id.platform_url'))), self.ids, next_attempt])
+        _logger.info(f'SSP platform unavailable: {self.env.cr.rowcount} outbox message(s) held until {next_attempt}')
+        self.invalidate_model(['state', 'next_attempt', 'write_date'])
+        self._trigger_cron(next_attempt)
+
+    def _schedule_retry(self, error):
+        self.ensure_one()
+        attempts = self.attempts + 1
+        if attempts >= MAX_ATTEMPTS:
+            self._mark_failed(error, attempts)
+            return
+        delay = min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+        next_attempt = fields.Datetime.now() + timedelta(seconds=random.uniform(delay / 2, delay))
+        _logger.warning(f'SSP {self.operation} call failed (attempt {attempts}), retrying at {next_attempt}: {error}')
+        self.write({
+            'state': 'pending',
+            'attempts': attempts,
+            'next_attempt': next_attempt,
+            'last_error': error,
+        })
+        self._trigger_cron(next_attempt)
+
+    def _mark_failed(self, error, attempts=None):
+        self.ensure_one()
+        _logger.error(f'SSP {self.operation} call failed permanently: {error}')
+        self.write({
+            'state': 'failed',
+            'attempts': attempts or self.attempts + 1,
+            'done_date': fields.Datetime.now(),
+            'last_error': error,
+        })
+        failed_handler = getattr(self.config_id, f'_ssp_outbox_{self.operation}_failed', None)
+        if failed_handler:
+            failed_handler(self)
+
+    def action_retry(self):
+        """Puts failed messages back in the queue for immediate delivery"""
+        self.filtered(lambda job: job.state == 'failed').write({
+            'state': 'pending',
+            'attempts': 0,
+            'next_attempt': fields.Datetime.now(),
+        })
+        self._trigger_cron()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.ssp_connector.models import ssp_circuit_breaker
+from odoo.addons.ssp_connector.tools.ssp_client import SspCircuitOpenError, SspThrottledError
+
+PLATFORM_URL = 'https://breaker.ssp.test'
+
+
+@tagged('post_install', '-at_install')
+class TestCircuitBreaker(TransactionCase):
+
+    def setUp(self):
+        super(TestCircuitBreaker, self).setUp()
+        # The breaker works in cursors of its own; let them share the test transaction
+        if self.registry.test_cr is None:
+            self.registry.enter_test_mode(self.cr)
+            self.addCleanup(self.registry.leave_test_mode)
+        self.addCleanup(ssp_circuit_breaker._open_until.pop, PLATFORM_URL, None)
+        self.Breaker = self.env['ssp.circuit.breaker']
+
+    def _breaker(self):
+        self.Breaker.invalidate_model()
+        return self.Breaker.search([('platform_url', '=', PLATFORM_URL)])
+
+    def _open(self):
+        for _i in range(ssp_circuit_breaker.MIN_CALLS):
+            self.Breaker._ssp_after_call(PLATFORM_URL, failed=True)
+
+    def _cool_down(self):
+        """Ages the breaker past COOLDOWN, as seen by every worker"""
+        self.cr.execute("""
+            UPDATE ssp_circuit_breaker SET opened_at = opened_at - make_interval(secs => %s)
+             WHERE platform_url = %s
+        """, [ssp_circuit_breaker.COOLDOWN + 1, PLATFORM_URL])
+        ssp_circuit_breaker._open_until.pop(PLATFORM_URL, None)
+
+    def test_stays_closed_below_failure_rate(self):
+        self.assertFalse(self.Breaker._ssp_before_call(PLATFORM_URL))
+        for failed in (True, False, True, False, False):
+            self.Breaker._ssp_after_call(PLATFORM_URL, failed=failed)
+        breaker = self._breaker()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertEqual((breaker.calls, breaker.failures), (5, 2))
+        self.assertFalse(self.Breaker._ssp_before_call(PLATFORM_URL))
+
+    def test_opens_on_failures(self):
+        for _i in range(ssp_circuit_breaker.MIN_CALLS - 1):
+            self.Breaker._ssp_after_call(PLATFORM_URL, failed=True)
+        self.assertEqual(self._breaker().state, 'closed', 'too few calls to trust the failure rate')
+        self.Breaker._ssp_after_call(PLATFORM_URL, failed=True)
+        self.assertEqual(self._breaker().state, 'open')
+        with self.assertRaises(SspCircuitOpenError):
+            self.Breaker._ssp_before_call(PLATFORM_URL)
+
+        # Other workers only know the row
+        ssp_circuit_breaker._open_until.pop(PLATFORM_URL, None)
+        with self.assertRaises(SspCircuitOpenError):
+            self.Breaker._ssp_before_call(PLATFORM_URL)
+
+    def test_single_probe_after_cool_down(self):
+        self._open()
+        self._cool_down()
+        self.assertTrue(self.Breaker._ssp_before_call(PLATFORM_URL))
+        self.assertEqual(self._breaker().state, 'half_open')
+        with self.assertRaises(SspCircuitOpenError, msg='only one probe at a time'):
+            self.Breaker._ssp_before_call(PLATFORM_URL)
+
+    def test_successful_probe_closes(self):
+        self._open()
+        self._cool_down()
+        self.Breaker._ssp_before_call(PLATFORM_URL)
+        self.Breaker._ssp_after_call(PLATFORM_URL, failed=False)
+        breaker = self._breaker()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertEqual((breaker.calls, breaker.failures), (0, 0))
+        self.assertFalse(breaker.opened_at)
+        self.assertFalse(self.Breaker._ssp_before_call(PLATFORM_URL))
+
+    def test_failed_probe_reopens(self):
+        self._open()
+        self._cool_down()
+        self.Breaker._ssp_before_call(PLATFORM_URL)
+        self.Breaker._ssp_after_call(PLATFORM_URL, failed=True)
+        self.assertEqual(self._breaker().state, 'open')
+        with self.assertRaises(SspCircuitOpenError):
+            self.Breaker._ssp_before_call(PLATFORM_URL)
+
+    def test_failing_fast_takes_no_token(self):
+        acquired = []
+        self.assertFalse(self.Breaker._ssp_before_call(PLATFORM_URL, acquire=lambda: acquired.append(1)))
+        self.assertEqual(len(acquired), 1)
+        self._open()
+        for _i in range(2):
+            with self.assertRaises(SspCircuitOpenError):
+                self.Breaker._ssp_before_call(PLATFORM_URL, acquire=lambda: acquired.append(1))
+        self.assertEqual(len(acquired), 1)
+
+    def test_throttled_probe_keeps_breaker_open(self):
+        self._open()
+        self._cool_down()
+
+        def throttled():
+            raise SspThrottledError(1.0)
+
+        with self.assertRaises(SspThrottledError):
+            self.Breaker._ssp_before_call(PLATFORM_URL, acquire=throttled)
+        self.assertEqual(self._breaker().state, 'open', 'the probe was not claimed')
+        self.assertTrue(self.Breaker._ssp_before_call(PLATFORM_URL, acquire=lambda: None))
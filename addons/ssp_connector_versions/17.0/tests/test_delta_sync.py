@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+# Every record of the tests is written in a window no other data can fall in
+SINCE = '2090-01-01 00:00:00'
+UNTIL = '2090-01-02 00:00:00'
+
+
+@tagged('post_install', '-at_install')
+class TestDeltaSync(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestDeltaSync, cls).setUpClass()
+        cls.config = cls.env['ssp.config'].create({
+            'company_id': cls.env['res.company'].create({'name': 'SSP Delta Sync'}).id,
+            'admin_email': 'delta-sync@ssp.test',
+            'platform_url': 'https://sync.ssp.test',
+        })
+        cls.partners = cls.env['res.partner'].create([{'name': f'SSP Sync {n}'} for n in range(4)])
+
+    def setUp(self):
+        super(TestDeltaSync, self).setUp()
+        # Pages are committed one by one; keep them inside the test transaction
+        self.patch(self.env.cr, 'commit', lambda: None)
+        self.config.last_sync = SINCE
+
+    def _written_at(self, records, write_date):
+        records.flush_recordset()
+        self.env.cr.execute(f"UPDATE {records._table} SET write_date = %s WHERE id = ANY(%s)", [write_date, records.ids])
+        records.invalidate_recordset(['write_date'])
+
+    def _sent(self):
+        """Returns the ids sent per model, in the order of the pages"""
+        sent = {}
+        for job in self.env['ssp.outbox'].search([('config_id', '=', self.config.id), ('operation', '=', 'sync')],
+                                                 order='id'):
+            sent.setdefault(job.payload['model'], []).extend(record['id'] for record in job.payload['records'])
+        return sent
+
+    def test_resume_from_cursor(self):
+        p0, p1, p2, p3 = self.partners
+        self._written_at(p0, '2090-01-01 01:00:00')
+        # Same write_date: the keyset position tells them apart by id
+        self._written_at(p1 | p2, '2090-01-01 02:00:00')
+        self._written_at(p3, '2090-01-01 03:00:00')
+        # A previous pass committed the page ending at p1, then died
+        self.config.sync_cursor = {'until': UNTIL, 'positions': {'res.partner': ['2090-01-01 02:00:00', p1.id]}}
+
+        self.config._ssp_delta_sync(page_size=1)
+        self.assertEqual(self._sent(), {'res.partner': [p2.id, p3.id]})
+        self.assertEqual(self.config.last_sync, fields.Datetime.to_datetime(UNTIL))
+        self.assertFalse(self.config.sync_cursor)
+
+    def test_window_is_bounded(self):
+        p0, p1, p2, p3 = self.partners
+        self._written_at(p0, '2089-12-31 23:59:59')
+        self._written_at(p1, '2090-01-01 12:00:00')
+        self._written_at(p2, UNTIL)
+        self._written_at(p3, '2090-01-02 00:00:01')
+        self.config.sync_cursor = {'until': UNTIL, 'positions': {}}
+
+        self.config._ssp_delta_sync()
+        self.assertEqual(self._sent(), {'res.partner': [p1.id, p2.id]}, 'the window is ]last_sync, until]')
+
+    def test_cursor_follows_pages(self):
+        p0, p1, p2, p3 = self.partners
+        self._written_at(self.partners, '2090-01-01 01:00:00')
+        self.config.sync_cursor = {'until': UNTIL, 'positions': {}}
+        cursors = []
+        enqueue = type(self.env['ssp.outbox'])._enqueue
+
+        def record_cursor(outbox, config, operation, payload=None, priority='interactive'):
+            cursors.append(config.sync_cursor)
+            return enqueue(outbox, config, operation, payload, priority)
+
+        self.patch(type(self.env['ssp.outbox']), '_enqueue', record_cursor)
+        self.config._ssp_delta_sync(page_size=3)
+        self.assertEqual(self._sent(), {'res.partner': [p0.id, p1.id, p2.id, p3.id]})
+        # Each page is queued with the position of the page before it
+        self.assertEqual([(cursor or {}).get('positions', {}).get('res.partner') for cursor in cursors],
+                         [None, ['2090-01-01 01:00:00', p2.id]])
+
+    def test_nothing_new(self):
+        self.config.last_sync = fields.Datetime.now()
+        self.config._ssp_delta_sync()
+        self.assertFalse(self._sent(), 'the safety lag keeps the pass from starting')
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import BaseCase
+
+from odoo.addons.ssp_connector.tools import metrics
+
+
+class TestMetrics(BaseCase):
+
+    def setUp(self):
+        super(TestMetrics, self).setUp()
+        # Samples recorded by other code of this process must not leak in
+        self.addCleanup(metrics.restore, metrics.take(force=True) or {})
+
+    def test_endpoint_label(self):
+        self.assertEqual(metrics.endpoint_label('/api/odoo/uploads/4f2a9c'), '/api/odoo/uploads/:id')
+        self.assertEqual(metrics.endpoint_label('/api/odoo/results?document_id=12'), '/api/odoo/results')
+        self.assertEqual(metrics.endpoint_label('/api/odoo/status'), '/api/odoo/status')
+
+    def test_format_labels_escapes(self):
+        self.assertEqual(metrics.format_labels(b='x"y', a='1\n'), 'a="1\\n",b="x\\"y"')
+
+    def test_take_and_restore(self):
+        metrics.inc('ssp_request_errors_total', endpoint='/x', status=500)
+        metrics.inc('ssp_request_errors_total', endpoint='/x', status=500)
+        deltas = metrics.take(force=True)
+        self.assertEqual(deltas, {('ssp_request_errors_total', 'endpoint="/x",status="500"'): 2})
+        self.assertIsNone(metrics.take(force=True))
+        metrics.restore(deltas)
+        self.assertEqual(metrics.take(force=True), deltas)
+
+    def test_histogram_buckets(self):
+        metrics.observe('ssp_request_duration_seconds', metrics.BUCKETS[0], endpoint='/x')
+        deltas = metrics.take(force=True)
+        self.assertEqual(deltas[('ssp_request_duration_seconds_count', 'endpoint="/x"')], 1)
+        for bound in metrics.BUCKETS:
+            key = ('ssp_request_duration_seconds_bucket', metrics.format_labels(le=bound, endpoint='/x'))
+            self.assertEqual(deltas[key], 1, 'buckets are cumulative')
+        self.assertEqual(deltas[('ssp_request_duration_seconds_bucket', 'endpoint="/x",le="+Inf"')], 1)
+
+    def test_render(self):
+        text = metrics.render([
+            ('ssp_request_duration_seconds_bucket', 'endpoint="/x",le="+Inf"', 2.0),
+            ('ssp_request_duration_seconds_bucket', 'endpoint="/x",le="0.1"', 1.0),
+            ('ssp_request_duration_seconds_count', 'endpoint="/x"', 2.0),
+            ('ssp_circuit_open', '', 0.0),
+        ])
+        lines = text.splitlines()
+        self.assertIn('# TYPE ssp_request_duration_seconds histogram', lines)
+        self.assertEqual(lines.count('# HELP ssp_request_duration_seconds Latency of calls to the SSP platform'), 1)
+        self.assertLess(
+            lines.index('ssp_request_duration_seconds_bucket{endpoint="/x",le="0.1"} 1'),
+            lines.index('ssp_request_duration_seconds_bucket{endpoint="/x",le="+Inf"} 2'),
+        )
+        self.assertIn('ssp_circuit_open 0', lines)
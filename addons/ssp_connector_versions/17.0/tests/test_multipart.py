@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import functools
+import gzip
+import io
+from email.parser import BytesParser
+
+from odoo.tests.common import BaseCase
+
+from odoo.addons.ssp_connector.tools.multipart import MultipartStream
+
+
+class TestMultipartStream(BaseCase):
+
+    def _parse(self, stream, body):
+        message = BytesParser().parsebytes(
+            b'Content-Type: ' + stream.headers['Content-Type'].encode() + b'\r\n\r\n' + body
+        )
+        return message.get_payload()
+
+    def _stream(self, **kwargs):
+        content = bytes(range(256)) * 1000
+        files = [('documents[]', 'bill "1".pdf', functools.partial(io.BytesIO, content), len(content), 'application/pdf')]
+        return MultipartStream([('manifest', '[{"move_id": 1}]')], files, chunk_size=4096, **kwargs), content
+
+    def test_length_matches_body(self):
+        stream, _content = self._stream()
+        body = b''.join(stream)
+        self.assertEqual(len(stream), len(body))
+
+    def test_parts(self):
+        stream, content = self._stream()
+        manifest, document = self._parse(stream, b''.join(stream))
+        self.assertEqual(manifest.get_param('name', header='content-disposition'), 'manifest')
+        self.assertEqual(manifest.get_payload(decode=True), b'[{"move_id": 1}]')
+        self.assertEqual(document.get_filename(), 'bill "1".pdf')
+        self.assertEqual(document.get_content_type(), 'application/pdf')
+        self.assertEqual(document.get_payload(decode=True), content)
+
+    def test_iterable_twice(self):
+        # A retried request iterates the body again
+        stream, _content = self._stream()
+        self.assertEqual(b''.join(stream), b''.join(stream))
+
+    def test_file_read_in_chunks(self):
+        stream, content = self._stream()
+        # field part, file header, file chunks, file terminator, closing boundary
+        file_chunks = list(stream)[2:-2]
+        self.assertEqual(b''.join(file_chunks), content)
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in file_chunks))
+
+    def test_gzip(self):
+        stream, content = self._stream(gzip=True)
+        self.assertEqual(len(stream), 0, 'compressed bodies are sent chunked')
+        self.assertEqual(stream.headers['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(stream))
+        self.assertEqual(self._parse(stream, body)[1].get_payload(decode=True), content)
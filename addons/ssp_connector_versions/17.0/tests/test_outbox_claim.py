@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import time
+
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.ssp_connector.models import ssp_circuit_breaker, ssp_outbox
+
+
+@tagged('post_install', '-at_install')
+class TestOutboxClaim(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestOutboxClaim, cls).setUpClass()
+        cls.Outbox = cls.env['ssp.outbox']
+        cls.config_a, cls.config_b = cls.env['ssp.config'].create([{
+            'company_id': cls.env['res.company'].create({'name': f'SSP Claim {name}'}).id,
+            'admin_email': f'claim-{name.lower()}@ssp.test',
+            'platform_url': 'https://claim.ssp.test',
+        } for name in ('A', 'B')])
+        # Only the messages of the tests are due
+        cls.Outbox.search([('state', '=', 'pending')]).write({'state': 'done'})
+
+    def setUp(self):
+        super(TestOutboxClaim, self).setUp()
+        # _claim commits the running flag; keep it inside the test transaction
+        self.patch(self.env.cr, 'commit', lambda: None)
+
+    def _jobs(self, config, count, priority='interactive', next_attempt='2000-01-01 00:00:00'):
+        return self.Outbox.create([{
+            'config_id': config.id,
+            'operation': 'submit',
+            'payload': {'n': n},
+            'priority': priority,
+            'next_attempt': next_attempt,
+        } for n in range(count)])
+
+    def test_tiers_are_interleaved(self):
+        interactive = self._jobs(self.config_a, 10)
+        backfill = self._jobs(self.config_a, 10, 'backfill')
+        jobs = self.Outbox._claim(10)
+        self.assertEqual(len(jobs & interactive), 8)
+        self.assertEqual(len(jobs & backfill), 2)
+        self.assertEqual(set(jobs.mapped('state')), {'running'})
+
+    def test_unused_share_goes_to_other_tier(self):
+        interactive = self._jobs(self.config_a, 2)
+        backfill = self._jobs(self.config_a, 10, 'backfill')
+        jobs = self.Outbox._claim(5)
+        self.assertEqual(jobs & interactive, interactive)
+        self.assertEqual(len(jobs & backfill), 3)
+
+    def test_backfill_claim_is_capped(self):
+        self._jobs(self.config_a, 20, 'backfill')
+        self.assertEqual(len(self.Outbox._claim(50)), ssp_outbox.BACKFILL_CLAIM)
+
+    def test_companies_take_turns(self):
+        self._jobs(self.config_a, 6)
+        late = self._jobs(self.config_b, 2, next_attempt='2000-01-02 00:00:00')
+        jobs = self.Outbox._claim(4)
+        self.assertEqual(jobs & late, late, 'a company is not starved by the backlog of another')
+        self.assertEqual(len(jobs.filtered(lambda job: job.config_id == self.config_a)), 2)
+
+    def test_future_messages_are_not_claimed(self):
+        self._jobs(self.config_a, 3, next_attempt='2999-01-01 00:00:00')
+        self.assertFalse(self.Outbox._claim(10))
+
+    def test_time_budget_releases_claimed_messages(self):
+        jobs = self._jobs(self.config_a, 3)
+        self.patch(type(self.Outbox), '_cron_time_budget', lambda self: 0)
+        self.Outbox._cron_process()
+        self.assertEqual(set(jobs.mapped('state')), {'pending'})
+        self.assertEqual(set(jobs.mapped('attempts')), {0})
+
+    def test_open_circuit_holds_platform_backlog(self):
+        jobs = self._jobs(self.config_a, 3) | self._jobs(self.config_b, 2)
+        self.patch(ssp_circuit_breaker, '_open_until', {'https://claim.ssp.test': time.monotonic() + 30})
+        Trigger = self.env['ir.cron.trigger']
+        triggers = Trigger.search_count([])
+        self.Outbox._cron_process(batch_size=2)
+        self.assertEqual(set(jobs.mapped('state')), {'pending'})
+        self.assertEqual(set(jobs.mapped('attempts')), {0})
+        self.assertGreater(min(jobs.mapped('next_attempt')), fields.Datetime.now())
+        self.assertEqual(Trigger.search_count([]) - triggers, 1, 'one cron trigger for the whole backlog')
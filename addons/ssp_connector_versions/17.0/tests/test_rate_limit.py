@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.ssp_connector.models import ssp_rate_limit
+from odoo.addons.ssp_connector.tools.ssp_client import SspThrottledError
+
+
+@tagged('post_install', '-at_install')
+class TestRateLimit(TransactionCase):
+
+    def setUp(self):
+        super(TestRateLimit, self).setUp()
+        # Buckets are updated in cursors of their own; let them share the test transaction
+        if self.registry.test_cr is None:
+            self.registry.enter_test_mode(self.cr)
+            self.addCleanup(self.registry.leave_test_mode)
+        self.RateLimit = self.env['ssp.rate.limit']
+
+    def _tokens(self, key):
+        self.cr.execute("SELECT tokens FROM ssp_rate_limit WHERE key = %s", [key])
+        return self.cr.fetchone()[0]
+
+    def _age(self, key, seconds):
+        """Moves the last refill of ``key`` back, as if ``seconds`` had passed"""
+        self.cr.execute("""
+            UPDATE ssp_rate_limit SET refilled_at = refilled_at - make_interval(secs => %s) WHERE key = %s
+        """, [seconds, key])
+
+    def test_burst_then_wait(self):
+        buckets = [('test:burst', 1.0)]
+        # Capacity is BURST_SECONDS of budget
+        self.assertEqual(self.RateLimit._ssp_take(buckets), 0)
+        self.assertEqual(self.RateLimit._ssp_take(buckets), 0)
+        wait = self.RateLimit._ssp_take(buckets)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 1.0)
+
+    def test_refill(self):
+        buckets = [('test:refill', 1.0)]
+        self.RateLimit._ssp_take(buckets)
+        self.RateLimit._ssp_take(buckets)
+        self._age('test:refill', 1.5)
+        self.assertEqual(self.RateLimit._ssp_take(buckets), 0)
+        self.assertAlmostEqual(self._tokens('test:refill'), 0.5, delta=0.1)
+
+    def test_refill_is_capped(self):
+        buckets = [('test:capped', 1.0)]
+        self.RateLimit._ssp_take(buckets)
+        self._age('test:capped', 3600)
+        self.RateLimit._ssp_take(buckets)
+        self.assertAlmostEqual(self._tokens('test:capped'), ssp_rate_limit.BURST_SECONDS - 1, delta=0.1)
+
+    def test_tokens_are_taken_from_all_buckets_or_none(self):
+        self.RateLimit._ssp_take([('test:empty', 0.5)])
+        self.assertTrue(self.RateLimit._ssp_take([('test:full', 1.0), ('test:empty', 0.5)]))
+        self.assertAlmostEqual(self._tokens('test:full'), 2.0, delta=0.1)
+
+    def test_backoff(self):
+        self.env['ir.config_parameter'].set_param('ssp_connector.rate_limit', '0')
+        config = self.env['ssp.config'].create({
+            'company_id': self.env['res.company'].create({'name': 'SSP Rate Limit'}).id,
+            'admin_email': 'rate-limit@ssp.test',
+            'rate_limit': 2.0,
+        })
+        key = f'company:{config.company_id.id}'
+        self.assertEqual(self.RateLimit._ssp_buckets(config), [(key, 2.0)])
+
+        self.RateLimit._ssp_backoff(config, 10)
+        self.assertAlmostEqual(self._tokens(key), -20.0, delta=0.1)
+        with self.assertRaises(SspThrottledError) as catcher:
+            self.RateLimit._ssp_acquire(config)
+        self.assertGreater(catcher.exception.retry_in, ssp_rate_limit.MAX_WAIT)
+
+        # The debt is paid back by the refill
+        self._age(key, 11)
+        self.assertEqual(self.RateLimit._ssp_take([(key, 2.0)]), 0)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import io
+
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.ssp_connector.models import ssp_upload_session
+
+CONTENT = b'0123456789abcdef'
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data or {}
+        self.text = str(self.data)
+
+    def json(self):
+        return self.data
+
+
+@tagged('post_install', '-at_install')
+class TestUploadSession(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestUploadSession, cls).setUpClass()
+        cls.config = cls.env['ssp.config'].create({
+            'company_id': cls.env['res.company'].create({'name': 'SSP Upload'}).id,
+            'admin_email': 'upload@ssp.test',
+            'platform_url': 'https://upload.ssp.test',
+        })
+        cls.attachment = cls.env['ir.attachment'].create({'name': 'scan.pdf', 'raw': CONTENT})
+
+    def setUp(self):
+        super(TestUploadSession, self).setUp()
+        # Sessions are written on cursors of their own; let them share the test transaction
+        if self.registry.test_cr is None:
+            self.registry.enter_test_mode(self.cr)
+            self.addCleanup(self.registry.leave_test_mode)
+        self.patch(ssp_upload_session, 'CHUNK_SIZE', 4)
+        # Fake platform: acknowledged offset and the offsets of the PUTs received
+        self.server = {'offset': 0, 'puts': [], 'conflicts': 0}
+        self.patch(type(self.config), '_ssp_request',
+                   lambda config, method, endpoint, **kwargs: self._fake_request(method, endpoint, **kwargs))
+
+    def _fake_request(self, method, endpoint, **kwargs):
+        if method == 'POST':
+            return FakeResponse(201, {'upload_id': 'up-new'})
+        if method == 'GET':
+            return FakeResponse(200, {'offset': self.server['offset']})
+        offset = int(kwargs['headers']['Upload-Offset'])
+        self.server['puts'].append(offset)
+        if self.server['conflicts'] or offset != self.server['offset']:
+            self.server['conflicts'] = max(self.server['conflicts'] - 1, 0)
+            return FakeResponse(409)
+        self.server['offset'] = offset + len(kwargs['data'])
+        return FakeResponse(204 if self.server['offset'] < len(CONTENT) else 200, {'offset': self.server['offset']})
+
+    def _upload(self):
+        return self.env['ssp.upload.session']._ssp_upload(
+            self.config, self.attachment, 'scan.pdf', lambda: io.BytesIO(CONTENT), len(CONTENT), 'application/pdf'
+        )
+
+    def _session(self, **vals):
+        session = self.env['ssp.upload.session'].create(dict({
+            'config_id': self.config.id,
+            'attachment_id': self.attachment.id,
+            'checksum': self.env['ssp.upload.session']._ssp_file_checksum(lambda: io.BytesIO(CONTENT)),
+            'filename': 'scan.pdf',
+            'size': len(CONTENT),
+            'chunk_size': 4,
+        }, **vals))
+        self.env.flush_all()
+        return session
+
+    def test_upload_in_chunks(self):
+        self.assertEqual(self._upload(), 'up-new')
+        self.assertEqual(self.server['puts'], [0, 4, 8, 12])
+        session = self.env['ssp.upload.session'].search([('attachment_id', '=', self.attachment.id)])
+        self.assertEqual((session.state, session.offset), ('complete', len(CONTENT)))
+
+    def test_resume_from_acknowledged_offset(self):
+        # The worker died after SSP acknowledged 8 bytes but before the session recorded it
+        session = self._session(upload_ref='up-1', offset=4)
+        self.server['offset'] = 8
+        self.assertEqual(self._upload(), 'up-1')
+        self.assertEqual(self.server['puts'], [8, 12])
+        session.invalidate_recordset()
+        self.assertEqual(session.state, 'complete')
+
+    def test_conflict_continues_at_server_offset(self):
+        self._session(upload_ref='up-1')
+        self.patch(type(self.env['ssp.upload.session']), '_ssp_resume_offset', lambda self, config, mimetype: 0)
+        # SSP already has the first chunk, its acknowledgement got lost
+        self.server['offset'] = 4
+        self._upload()
+        self.assertEqual(self.server['puts'], [0, 4, 8, 12])
+
+    def test_conflict_without_progress_stops(self):
+        self._session(upload_ref='up-1')
+        self.server['conflicts'] = 100
+        with self.assertRaisesRegex(Exception, 'keeps refusing'):
+            self._upload()
+        self.assertEqual(self.server['puts'], [0], 'no retry at an offset SSP does not move from')
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (5, 30)
+
+# Pool bounds: distinct hosts cached, and connections kept per host
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# Concurrent calls of a fan-out; kept within the pool so connections are reused
+FAN_OUT_WORKERS = POOL_MAXSIZE
+
+# Only these methods are retried after the request reached the platform
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+USER_AGENT = 'ssp-connector-odoo'
+
+_lock = threading.Lock()
+_state = {'pid': None, 'session': None}
+
+
+class SspPermanentError(Exception):
+    """Raised for platform answers that will not succeed if the call is retried"""
+
+
+class SspCircuitOpenError(Exception):
+    """Raised without calling the platform while its circuit breaker is open"""
+
+    def __init__(self, platform_url, retry_in):
+        super(SspCircuitOpenError, self).__init__(f'SSP platform {platform_url} unavailable, circuit open')
+        self.platform_url = platform_url
+        self.retry_in = retry_in
+
+
+class SspThrottledError(Exception):
+    """Raised when the platform rate limit leaves no room for a call before ``retry_in`` seconds"""
+
+    def __init__(self, retry_in):
+        super(SspThrottledError, self).__init__(f'SSP rate limit reached, retry in {retry_in:.1f}s')
+        self.retry_in = retry_in
+
+
+class JitterRetry(Retry):
+    """Exponential backoff with full jitter, so workers do not retry in lockstep"""
+
+    def get_backoff_time(self):
+        backoff = super(JitterRetry, self).get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+def _build_session():
+    retry = JitterRetry(
+        total=3,
+        connect=3,
+        read=2,
+        status=2,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=IDEMPOTENT_METHODS,
+        # A Retry-After answer (429/503) is never slept on inside the worker:
+        # it reaches the shared rate limit, and the outbox holds the message
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=False,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def get_session():
+    """Returns the keep-alive session shared by the current worker process
+
+    The session is created lazily and rebuilt after a fork, so prefork
+    workers never share sockets inherited from the parent process.
+    """
+    pid = os.getpid()
+    session = _state['session']
+    if session is not None and _state['pid'] == pid:
+        return session
+    with _lock:
+        if _state['session'] is None or _state['pid'] != pid:
+            _state['session'] = _build_session()
+            _state['pid'] = pid
+            _logger.debug('SSP HTTP session created for process %s', pid)
+        return _state['session']
+
+
+def retry_after(response, default=1.0):
+    """Returns the seconds a 429/503 answer asks to wait (Retry-After as delay or HTTP date)"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """Sends a request to the platform through the pooled session"""
+    return get_session().request(method, url, timeout=timeout, **kwargs)
+
+
+def request_many(calls, max_workers=FAN_OUT_WORKERS):
+    """Sends independent ``(method, url, kwargs)`` requests concurrently
+
+    Returns ``(response or RequestException, seconds)`` for each call, in
+    order. The worker threads only do HTTP: they must never touch the ORM.
+    """
+    def send(call):
+        method, url, kwargs = call
+        started = time.monotonic()
+        try:
+            result = request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            result = e
+        return result, time.monotonic() - started
+
+    if len(calls) <= 1:
+        return [send(call) for call in calls]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(calls)), thread_name_prefix='ssp') as pool:
+        return list(pool.map(send, calls))
@@ -1,2 +1,16 @@
 # -*- coding: utf-8 -*-
 from . import ssp_config
+from . import ssp_outbox
+from . import ssp_circuit_breaker
+from . import ssp_rate_limit
+from . import ssp_metric
+from . import ssp_document
+from . import ssp_extraction_cache
+from . import ssp_prepared_file
+from . import ssp_upload_session
+from . import ssp_partner_key
+from . import ssp_sync
+from . import ssp_history_export
+from . import account_move
+from . import ir_attachment
+from . import res_partner
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+import logging
+import time
+
+from ..tools.ssp_client import SspCircuitOpenError
+
+_logger = logging.getLogger(__name__)
+
+# Failure rate over the sliding window that opens the breaker
+FAILURE_RATE = 0.5
+# Calls needed in the window before the failure rate is trusted
+MIN_CALLS = 5
+# Length of the counting window, in seconds
+WINDOW = 60
+# Time the breaker stays open before a single probe call is let through
+COOLDOWN = 30
+# A probe that did not report back after this long is considered lost
+PROBE_TIMEOUT = 120
+
+# Per-process shortcut: {platform_url: monotonic time until which the breaker is known open}
+_open_until = {}
+
+
+class SspCircuitBreaker(models.Model):
+    _name = 'ssp.circuit.breaker'
+    _description = 'SSP Circuit Breaker'
+    _rec_name = 'platform_url'
+
+    platform_url = fields.Char(
+        string='Platform URL',
+        required=True,
+        readonly=True
+    )
+
+    state = fields.Selection([
+        ('closed', 'Closed'),
+        ('open', 'Open'),
+        ('half_open', 'Half Open')
+    ], string='Status', default='closed', required=True, readonly=True)
+
+    calls = fields.Integer(string='Calls in Window', readonly=True)
+    failures = fields.Integer(string='Failures in Window', readonly=True)
+    window_start = fields.Datetime(string='Window Start', readonly=True)
+    opened_at = fields.Datetime(string='Opened At', readonly=True)
+
+    _sql_constraints = [
+        ('platform_url_unique', 'unique(platform_url)',
+         'Only one circuit breaker per platform URL is allowed!')
+    ]
+
+    # The breaker is shared by every worker through its row. It is read and
+    # updated in a short transaction of its own, so the state is always
+    # current and survives a rollback of the caller's transaction.
+
+    @api.model
+    def _ssp_before_call(self, platform_url, acquire=None):
+        """Raises SspCircuitOpenError instead of calling a platform known to be down
+
+        ``acquire`` takes the rate limit token of the call. It only runs once
+        the breaker lets the call through, so calls failing fast spend no
+        shared budget and never wait for it. Returns True when the call is
+        the single probe of a half-open breaker.
+        """
+        deadline = _open_until.get(platform_url)
+        if deadline and time.monotonic() < deadline:
+            raise SspCircuitOpenError(platform_url, deadline - time.monotonic())
+
+        with self.env.registry.cursor() as cr:
+            probe = self._ssp_check_row(self._ssp_lock_row(cr, platform_url), platform_url)
+        if acquire:
+            acquire()
+        if not probe:
+            return False
+
+        # The token is taken before claiming the probe: a throttled probe
+        # must not leave the breaker half-open until PROBE_TIMEOUT
+        with self.env.registry.cursor() as cr:
+            row = self._ssp_lock_row(cr, platform_url)
+            if not self._ssp_check_row(row, platform_url):
+                return False
+            cr.execute("""
+                UPDATE ssp_circuit_breaker
+                   SET state = 'half_open', opened_at = clock_timestamp() at time zone 'UTC'
+                 WHERE id = %s
+            """, [row['id']])
+            _open_until.pop(platform_url, None)
+            _logger.info(f'SSP circuit half-open for {platform_url}, probing')
+            return True
+
+    @api.model
+    def _ssp_raise_if_open(self, platform_url):
+        """Raises SspCircuitOpenError while calls to the platform fail fast, without claiming a probe
+
+        Lets callers skip local work done before their call (file reading,
+        preprocessing) that would be thrown away anyway.
+        """
+        deadline = _open_until.get(platform_url)
+        if deadline and time.monotonic() < deadline:
+            raise SspCircuitOpenError(platform_url, deadline - time.monotonic())
+        with self.env.registry.cursor() as cr:
+            self._ssp_check_row(self._ssp_lock_row(cr, platform_url), platform_url)
+
+    @api.model
+    def _ssp_check_row(self, row, platform_url):
+        """Returns whether a call may probe the platform; raises while calls must fail fast"""
+        state, opened_for = row['state'], row['opened_for']
+        if state == 'closed':
+            _open_until.pop(platform_url, None)
+            return False
+        if state == 'open' and opened_for < COOLDOWN:
+            retry_in = COOLDOWN - opened_for
+            _open_until[platform_url] = time.monotonic() + retry_in
+            raise SspCircuitOpenError(platform_url, retry_in)
+        if state == 'half_open' and opened_for < PROBE_TIMEOUT:
+            # Another worker is probing the platform
+            raise SspCircuitOpenError(platform_url, COOLDOWN)
+        # Cool-down elapsed (or lost probe): this call may probe
+        return True
+
+    @api.model
+    def _ssp_after_call(self, platform_url, failed):
+        """Records the outcome of a call and moves the breaker accordingly"""
+        with self.env.registry.cursor() as cr:
+            row = self._ssp_lock_row(cr, platform_url)
+            if row['state'] == 'half_open':
+                if failed:
+                    self._ssp_open(cr, row, platform_url)
+                else:
+                    cr.execute("""
+                        UPDATE ssp_circuit_breaker
+                           SET state = 'closed', calls = 0, failures = 0, opened_at = NULL,
+                               window_start = clock_timestamp() at time zone 'UTC'
+                         WHERE id = %s
+                    """, [row['id']])
+                    _logger.info(f'SSP circuit closed for {platform_url}')
+                return
+            if row['state'] == 'open':
+                return
+
+            calls, failures = row['calls'] + 1, row['failures'] + int(failed)
+            if row['window_age'] is None or row['window_age'] > WINDOW:
+                calls, failures = 1, int(failed)
+                cr.execute("""
+                    UPDATE ssp_circuit_breaker SET window_start = clock_timestamp() at time zone 'UTC' WHERE id = %s
+                """, [row['id']])
+            if calls >= MIN_CALLS and failures / calls >= FAILURE_RATE:
+                self._ssp_open(cr, row, platform_url)
+                return
+            cr.execute("""
+                UPDATE ssp_circuit_breaker SET calls = %s, failures = %s WHERE id = %s
+            """, [calls, failures, row['id']])
+
+    @api.model
+    def _ssp_lock_row(self, cr, platform_url):
+        cr.execute("""
+            INSERT INTO ssp_circuit_breaker (platform_url, state, calls, failures, window_start)
+            VALUES (%s, 'closed', 0, 0, clock_timestamp() at time zone 'UTC')
+            ON CONFLICT (platform_url) DO NOTHING
+        """, [platform_url])
+        cr.execute("""
+            SELECT id, state, calls, failures,
+                   EXTRACT(EPOCH FROM (clock_timestamp() at time zone 'UTC') - window_start) AS window_age,
+                   COALESCE(EXTRACT(EPOCH FROM (clock_timestamp() at time zone 'UTC') - opened_at), 0) AS opened_for
+              FROM ssp_circuit_breaker
+             WHERE platform_url = %s
+               FOR UPDATE
+        """, [platform_url])
+        return cr.dictfetchone()
+
+    @api.model
+    def _ssp_open(self, cr, row, platform_url):
+        cr.execute("""
+            UPDATE ssp_circuit_breaker
+               SET state = 'open', opened_at = clock_timestamp() at time zone 'UTC', calls = 0, failures = 0
+             WHERE id = %s
+        """, [row['id']])
+        _open_until[platform_url] = time.monotonic() + COOLDOWN
+        _logger.warning(f'SSP circuit opened for {platform_url}: calls fail fast for {COOLDOWN}s')
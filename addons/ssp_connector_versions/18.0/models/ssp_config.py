@@ -1,10 +1,27 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 import requests
+import functools
+import io
+import json
 import logging
+import os
+import secrets
+import time
+
+from ..tools import metrics, pdf_data, ssp_client, sso_token
+from ..tools.multipart import MultipartStream
+from ..tools.ssp_client import SspCircuitOpenError, SspPermanentError, SspThrottledError
 
 _logger = logging.getLogger(__name__)
 
+# Fields served from the _get_config_values cache; writing them invalidates it
+CACHED_FIELDS = {'company_id', 'active', 'platform_url', 'api_key', 'account_id', 'sso_mode', 'sso_token_ttl',
+                 'dashboard_keep_alive'}
+
+# Files above this size are sent ahead through a resumable upload session
+CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+
 
 class SspConfig(models.Model):
     _name = 'ssp.config'
@@ -71,6 +88,70 @@ class SspConfig(models.Model):
         readonly=True
     )
     
+    submit_batch_size = fields.Integer(
+        string='Upload Batch Size',
+        default=25,
+        help='Number of vendor bills sent to SSP in a single upload request'
+    )
+    
+    sso_mode = fields.Selection([
+        ('signed', 'Short-lived Signed Token'),
+        ('legacy', 'Permanent Token (legacy)')
+    ], string='SSO Mode', default='signed', required=True,
+        help='Signed: the dashboard URL carries a token minted locally that expires quickly. '
+             'Legacy: the permanent API key is put in the URL.')
+    
+    sso_token_ttl = fields.Integer(
+        string='SSO Token Lifetime (s)',
+        default=120,
+        help='Validity of the signed SSO tokens, in seconds'
+    )
+    
+    dashboard_keep_alive = fields.Integer(
+        string='Dashboard Keep-Alive (min)',
+        default=30,
+        help='Minutes the dashboard stays loaded in the background after leaving it; '
+             '0 reloads it on every visit'
+    )
+    
+    upload_compression = fields.Boolean(
+        string='Compress Uploads',
+        default=False,
+        help='Gzip upload requests on the fly; saves bandwidth on slow links at some CPU cost'
+    )
+    
+    image_preprocessing = fields.Boolean(
+        string='Preprocess Images',
+        default=True,
+        help='Send scanned and photographed bills as grayscale, straightened JPEG at the target resolution'
+    )
+    
+    image_target_dpi = fields.Integer(
+        string='Image Resolution (DPI)',
+        default=200,
+        help='Resolution images are reduced to before upload'
+    )
+    
+    image_quality = fields.Integer(
+        string='JPEG Quality',
+        default=75,
+        help='JPEG quality (1-95) of the preprocessed images'
+    )
+    
+    rate_limit = fields.Float(
+        string='Rate Limit (calls/s)',
+        default=5.0,
+        help='Calls per second this company may make to SSP, shared by all workers; 0 for no company limit. '
+             'The platform-wide budget is set by the ssp_connector.rate_limit parameter'
+    )
+    
+    local_extraction = fields.Boolean(
+        string='Read Embedded Invoice Data',
+        default=True,
+        help='Encode bills whose PDF embeds a complete Factur-X/UBL invoice without calling SSP, '
+             'and send the XML or text layer of born-digital PDFs instead of the whole file'
+    )
+    
     # SQL Constraint: one configuration per company
     _sql_constraints = [
         ('company_unique', 'unique(company_id)', 
@@ -79,8 +160,7 @@ class SspConfig(models.Model):
     
     @api.model_create_multi
     def create(self, vals_list):
-        """Override create to automatically register on SSP"""
-        import secrets
+        """Override create to queue the automatic registration on SSP"""
         for vals in vals_list:
             # Generate automatic Communication Token if not in vals
             if not vals.get('odoo_api_key'):
@@ -91,23 +171,18 @@ class SspConfig(models.Model):
                 vals['admin_name'] = self.env.user.name
 
         records = super(SspConfig, self).create(vals_list)
+        self.env.registry.clear_cache()
         
+        # Registration is sent by the outbox cron once this transaction commits
         for record in records:
-            try:
-                record._register_on_ssp()
-            except Exception as e:
-                _logger.error(f'Failed to auto-register on SSP: {str(e)}')
-                record.state = 'error'
+            record._register_on_ssp()
         
         return records
     
     def _register_on_ssp(self):
-        """Automatically registers the company on SSP"""
+        """Queues the automatic registration of the company on SSP"""
         self.ensure_one()
         
-        # The key will be generated in create if empty
-        token = self.odoo_api_key or secrets.token_urlsafe(32)
-        
         # Get current Odoo data
         odoo_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
         odoo_database = self.env.cr.dbname
@@ -125,64 +200,431 @@ class SspConfig(models.Model):
             'country': self.company_id.country_id.code if self.company_id.country_id else None
         }
         
-        _logger.info(f'Registering on SSP: {payload["company_name"]} ({payload["admin_email"]})')
+        _logger.info(f'Queuing SSP registration: {payload["company_name"]} ({payload["admin_email"]})')
+        
+        return self.env['ssp.outbox']._enqueue(self, 'register', payload)
+    
+    def _ssp_outbox_register(self, job):
+        """Outbox handler: sends a queued registration and stores the result"""
+        self.ensure_one()
         
         try:
-            response = requests.post(
-                f'{self.platform_url}/api/odoo/register',
-                json=payload,
-                timeout=30
+            response = self._ssp_request(
+                'POST', '/api/odoo/register',
+                json=job.payload,
+                headers={'Idempotency-Key': job.idempotency_key}
             )
+        except requests.exceptions.RequestException as e:
+            raise Exception(f'Connection error: {str(e)}')
+        
+        credentials = self._ssp_parse_registration(response)
+        self.write(dict(credentials, state='connected', last_sync=fields.Datetime.now()))
+    
+    @api.model
+    def _ssp_outbox_register_batch(self, jobs):
+        """Outbox batch handler: sends many queued registrations concurrently
+        
+        Returns {job id: exception} for the registrations that did not succeed.
+        """
+        responses = self._ssp_request_many([
+            (job.config_id, 'POST', '/api/odoo/register', {
+                'json': job.payload,
+                'headers': {'Idempotency-Key': job.idempotency_key},
+            }) for job in jobs
+        ])
+        
+        errors = {}
+        connected = self.browse()
+        for job, response in zip(jobs, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                credentials = job.config_id._ssp_parse_registration(response)
+            except requests.exceptions.RequestException as e:
+                errors[job.id] = Exception(f'Connection error: {str(e)}')
+                continue
+            except Exception as e:
+                errors[job.id] = e
+                continue
+            if credentials:
+                job.config_id.write(credentials)
+            connected |= job.config_id
+        
+        # One write for every configuration that is now connected
+        connected.write({'state': 'connected', 'last_sync': fields.Datetime.now()})
+        return errors
+    
+    def _ssp_parse_registration(self, response):
+        """Returns the credentials to store from a registration answer, or raises"""
+        self.ensure_one()
+        
+        if response.status_code == 200:
+            data = response.json()
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get('success'):
-                    # Update with returned data
-                    self.write({
-                        'account_id': str(data.get('account_id')),
-                        'api_key': data.get('sso_token', ''),  # 🆕 Save SSO token
-                        'state': 'connected',
-                        'last_sync': fields.Datetime.now()
-                    })
-                    
-                    _logger.info(f'Successfully registered on SSP: Account ID {self.account_id}')
-                    
-                    return {
-                        'type': 'ir.actions.client',
-                        'tag': 'display_notification',
-                        'params': {
-                            'title': 'Success!',
-                            'message': f'Account created on SSP! Account ID: {self.account_id}',
-                            'type': 'success',
-                            'sticky': False,
-                        }
-                    }
-                else:
-                    raise Exception(data.get('message', 'Unknown error'))
-            elif response.status_code == 409:
-                # If the email is already registered, we mark as connected
-                self.state = 'connected'
-                raise Exception('This email is already registered on the platform. Your configuration was marked as connected, but you might need to update the token manually if the dashboard does not open.')
+            if not data.get('success'):
+                raise SspPermanentError(data.get('message', 'Unknown error'))
+            
+            _logger.info(f'Successfully registered on SSP: Account ID {data.get("account_id")}')
+            return {
+                'account_id': str(data.get('account_id')),
+                'api_key': data.get('sso_token', ''),
+            }
+        elif response.status_code == 409:
+            # If the email is already registered, we mark as connected
+            _logger.warning(f'{self.admin_email} is already registered on SSP; configuration marked as connected, the token may need a manual update')
+            return {}
+        
+        self._ssp_raise_for_status(response)
+        raise SspPermanentError(f'Unexpected answer HTTP {response.status_code}: {response.text}')
+    
+    def _ssp_outbox_register_failed(self, job):
+        """Outbox handler: the registration gave up after its last attempt"""
+        self.state = 'error'
+    
+    def _ssp_outbox_submit(self, job):
+        """Outbox handler: uploads a batch of vendor bills in one multipart request"""
+        self.ensure_one()
+        # Nothing is read or prepared for a platform known to be down
+        self.env['ssp.circuit.breaker']._ssp_raise_if_open(self.platform_url)
+        moves = self.env['account.move'].sudo().browse(job.payload['move_ids']).exists()
+        moves = moves.filtered(lambda m: m.state == 'draft')
+        documents = moves._ssp_get_documents()
+        
+        without_document = moves.filtered(lambda m: m not in documents)
+        if without_document:
+            without_document.write({'ssp_state': 'error'})
+            without_document._ssp_notify_updated()
+        
+        # Skip files submitted since this batch was queued, and send
+        # identical files of the same batch only once
+        documents = moves._ssp_reuse_known_documents(self, documents)
+        first_by_checksum = {}
+        for move, attachment in documents.items():
+            first_by_checksum.setdefault(attachment.checksum or move.id, move)
+        to_upload = {move: documents[move] for move in first_by_checksum.values()}
+        
+        # Born-digital PDFs: complete embedded e-invoices are encoded without
+        # SSP, the others send their XML or text layer instead of the PDF
+        embedded = self._ssp_read_embedded_data(to_upload) if self.local_extraction else {}
+        local = {move: found for move, found in embedded.items() if pdf_data.is_complete(found[2])}
+        if local:
+            self._ssp_apply_local_results(documents, first_by_checksum, local)
+            documents = {
+                move: attachment for move, attachment in documents.items()
+                if first_by_checksum[attachment.checksum or move.id] not in local
+            }
+            to_upload = {move: attachment for move, attachment in to_upload.items() if move not in local}
+        if not to_upload:
+            return
+        
+        manifest = []
+        files = []
+        for move, attachment in to_upload.items():
+            entry = {
+                'move_id': move.id,
+                'filename': attachment.name,
+                'checksum': attachment.checksum,
+            }
+            if move in embedded:
+                kind, content, _result = embedded[move]
+                entry['content'] = kind
+                extension, mimetype = ('txt', 'text/plain') if kind == 'text' else ('xml', 'application/xml')
+                filename = f'{os.path.splitext(attachment.name)[0]}.{extension}'
+                open_file, size = functools.partial(io.BytesIO, content), len(content)
             else:
-                raise Exception(f'HTTP {response.status_code}: {response.text}')
-                
+                filename, open_file, size, mimetype = attachment._ssp_upload_source(self)
+            if size > CHUNKED_UPLOAD_THRESHOLD:
+                # Large scans go ahead in resumable chunks; the batch only references them
+                entry['upload_id'] = self.env['ssp.upload.session']._ssp_upload(
+                    self, attachment, filename, open_file, size, mimetype
+                )
+            else:
+                files.append(('documents[]', filename, open_file, size, mimetype))
+            manifest.append(entry)
+        
+        # Files are streamed from the filestore, never loaded whole in memory
+        body = MultipartStream([('manifest', json.dumps(manifest))], files, gzip=self.upload_compression)
+        try:
+            response = self._ssp_request(
+                'POST', '/api/odoo/invoices/upload',
+                data=body,
+                headers=dict(body.headers, **{'Idempotency-Key': job.idempotency_key})
+            )
         except requests.exceptions.RequestException as e:
-            _logger.error(f'SSP Registration Error: {str(e)}')
-            self.state = 'error'
             raise Exception(f'Connection error: {str(e)}')
+        
+        self._ssp_raise_for_status(response)
+        
+        results = {r.get('move_id'): r for r in response.json().get('results', [])}
+        refs_by_checksum = {}
+        rejected = self.env['account.move']
+        for move, attachment in documents.items():
+            sent = first_by_checksum[attachment.checksum or move.id]
+            result = results.get(sent.id)
+            if result and result.get('status') == 'accepted':
+                move.write({
+                    'ssp_state': 'submitted',
+                    'ssp_document_ref': result.get('document_id'),
+                })
+                refs_by_checksum[attachment.checksum] = result.get('document_id')
+            else:
+                rejected |= move
+        self.env['ssp.document']._ssp_register_submitted(self.company_id, refs_by_checksum)
+        if rejected:
+            _logger.warning(f'SSP rejected {len(rejected)} of {len(documents)} documents in batch {job.idempotency_key}')
+            rejected.write({'ssp_state': 'error'})
+            rejected._ssp_notify_updated()
+    
+    def _ssp_read_embedded_data(self, documents):
+        """Returns {move: (kind, content, result)} for the PDFs carrying their own data"""
+        embedded = {}
+        for move, attachment in documents.items():
+            if attachment.mimetype != 'application/pdf':
+                continue
+            open_file, _size = attachment._ssp_stream_source()
+            found = pdf_data.read(open_file)
+            if found:
+                embedded[move] = found
+                metrics.inc('ssp_local_extractions_total', kind=found[0],
+                            result='complete' if pdf_data.is_complete(found[2]) else 'sent')
+        return embedded
+    
+    def _ssp_apply_local_results(self, documents, first_by_checksum, local):
+        """Encodes the bills whose file is a complete e-invoice, for every bill sharing the file"""
+        results = []
+        for move, attachment in documents.items():
+            sent = first_by_checksum[attachment.checksum or move.id]
+            if sent in local:
+                kind, _content, result = local[sent]
+                results.append(dict(result, move_id=move.id, confidence=1.0, source=kind))
+        self.env['account.move'].sudo().with_company(self.company_id)._ssp_apply_results(self, results)
+    
+    def _ssp_outbox_submit_failed(self, job):
+        """Outbox handler: the upload gave up after its last attempt"""
+        moves = self.env['account.move'].sudo().browse(job.payload['move_ids']).exists()
+        failed = moves.filtered(lambda m: m.ssp_state == 'queued')
+        failed.write({'ssp_state': 'error'})
+        failed._ssp_notify_updated()
+    
+    def _ssp_request(self, method, endpoint, **kwargs):
+        """Calls an SSP endpoint through the pooled per-process HTTP client
+        
+        Raises SspCircuitOpenError without any network call while the
+        circuit breaker of the platform is open, and SspThrottledError when
+        the shared rate limit has no room for the call soon enough.
+        """
+        self.ensure_one()
+        label = metrics.endpoint_label(endpoint)
+        # Fail fast while the platform is known to be down; the rate limit
+        # token is only taken for calls the breaker lets through
+        try:
+            self.env['ssp.circuit.breaker']._ssp_before_call(
+                self.platform_url, acquire=functools.partial(self.env['ssp.rate.limit']._ssp_acquire, self)
+            )
+        except SspCircuitOpenError:
+            metrics.inc('ssp_request_errors_total', endpoint=label, status='circuit_open')
+            raise
+        
+        started = time.monotonic()
+        try:
+            response = ssp_client.request(method, self._ssp_url(endpoint), **self._ssp_auth(kwargs))
+        except requests.exceptions.RequestException as e:
+            self._ssp_record_call(label, e, time.monotonic() - started)
+            raise
+        self._ssp_record_call(label, response, time.monotonic() - started)
+        return response
     
     @api.model
-    def get_config(self):
-        """Returns the active configuration for the current company"""
-        return self.search([
-            ('company_id', '=', self.env.company.id),
+    def _ssp_request_many(self, calls):
+        """Sends independent platform calls concurrently through a bounded thread pool
+        
+        ``calls`` is a list of ``(config, method, endpoint, kwargs)``. Returns,
+        in the same order, the response or the exception of each call. Only
+        the HTTP exchange runs in the pool threads; the circuit breaker, the
+        rate limit and metrics are handled here, in the caller's thread.
+        """
+        breaker = self.env['ssp.circuit.breaker']
+        rate_limit = self.env['ssp.rate.limit']
+        results = [None] * len(calls)
+        circuits = {}
+        pending = []
+        for index, (config, method, endpoint, kwargs) in enumerate(calls):
+            label = metrics.endpoint_label(endpoint)
+            url = config.platform_url
+            try:
+                if url not in circuits:
+                    # While half-open, only the first call of the fan-out probes the platform
+                    acquire = functools.partial(rate_limit._ssp_acquire, config)
+                    circuits[url] = 'probe' if breaker._ssp_before_call(url, acquire=acquire) else 'closed'
+                elif circuits[url] == 'probe':
+                    circuits[url] = SspCircuitOpenError(url, 0)
+                elif circuits[url] == 'closed':
+                    rate_limit._ssp_acquire(config)
+            except SspCircuitOpenError as e:
+                circuits[url] = e
+            except SspThrottledError as e:
+                results[index] = e
+                continue
+            if isinstance(circuits[url], Exception):
+                metrics.inc('ssp_request_errors_total', endpoint=label, status='circuit_open')
+                results[index] = circuits[url]
+                continue
+            pending.append((index, config, label, (method, config._ssp_url(endpoint), config._ssp_auth(kwargs))))
+        
+        answers = ssp_client.request_many([call for _index, _config, _label, call in pending])
+        for (index, config, label, _call), (result, seconds) in zip(pending, answers):
+            config._ssp_record_call(label, result, seconds)
+            results[index] = result
+        return results
+    
+    def _ssp_url(self, endpoint):
+        self.ensure_one()
+        return f'{self.platform_url.rstrip("/")}{endpoint}'
+    
+    def _ssp_auth(self, kwargs):
+        """Returns the request kwargs with the platform credentials added"""
+        self.ensure_one()
+        kwargs = dict(kwargs)
+        if self.api_key:
+            kwargs['headers'] = dict(kwargs.get('headers') or {})
+            kwargs['headers'].setdefault('Authorization', f'Bearer {self.api_key}')
+        return kwargs
+    
+    def _ssp_record_call(self, label, result, seconds):
+        """Feeds the outcome of a platform call to the metrics and the circuit breaker"""
+        self.ensure_one()
+        metrics.observe('ssp_request_duration_seconds', seconds, endpoint=label)
+        if isinstance(result, Exception):
+            metrics.inc('ssp_request_errors_total', endpoint=label, status='connection')
+            failed = True
+        else:
+            if result.status_code >= 400:
+                metrics.inc('ssp_request_errors_total', endpoint=label, status=result.status_code)
+            if result.status_code == 429:
+                # Every worker holds off for as long as the platform asked
+                self.env['ssp.rate.limit']._ssp_backoff(self, ssp_client.retry_after(result))
+            failed = result.status_code >= 500
+        self.env['ssp.circuit.breaker']._ssp_after_call(self.platform_url, failed=failed)
+        self.env['ssp.metric']._ssp_flush()
+    
+    @api.model
+    def _cron_refresh_health(self):
+        """Checks every active configuration against the platform, concurrently
+        
+        Configurations are then updated with one write per resulting state.
+        Unreachable platforms keep their last known state; the breaker and
+        the metrics already report them.
+        """
+        configs = self.search([('active', '=', True), ('api_key', '!=', False)])
+        responses = self._ssp_request_many([(config, 'GET', '/api/odoo/status', {}) for config in configs])
+        by_state = {'connected': self.browse(), 'error': self.browse()}
+        for config, response in zip(configs, responses):
+            if isinstance(response, Exception):
+                continue
+            if response.status_code == 200:
+                by_state['connected'] |= config
+            elif response.status_code in (401, 403, 404):
+                by_state['error'] |= config
+        for state, group in by_state.items():
+            group.filtered(lambda c: c.state != state).write({'state': state})
+    
+    @api.model
+    def _ssp_raise_for_status(self, response):
+        """Raises the outbox error matching a failed platform answer
+
+        Throttled calls are held for the Retry-After delay without spending
+        an attempt; timeouts and server errors are retried; any other
+        non-2xx answer fails the message permanently.
+        """
+        if response.status_code == 429:
+            raise SspThrottledError(ssp_client.retry_after(response))
+        if response.status_code == 408 or response.status_code >= 500:
+            raise Exception(f'HTTP {response.status_code}: {response.text}')
+        if response.status_code >= 300:
+            raise SspPermanentError(f'HTTP {response.status_code}: {response.text}')
+    
+    def write(self, vals):
+        res = super(SspConfig, self).write(vals)
+        if CACHED_FIELDS.intersection(vals):
+            # Clearing the registry cache is signaled to every other worker
+            self.env.registry.clear_cache()
+        return res
+    
+    def unlink(self):
+        res = super(SspConfig, self).unlink()
+        self.env.registry.clear_cache()
+        return res
+    
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_config_values(self, company_id):
+        """Returns the cached fields needed to open SSP for a company, or None"""
+        config = self.sudo().search([
+            ('company_id', '=', company_id),
             ('active', '=', True)
         ], limit=1)
+        if not config:
+            return None
+        return tools.frozendict({
+            'id': config.id,
+            'platform_url': config.platform_url,
+            'api_key': config.api_key,
+            'account_id': config.account_id,
+            'sso_mode': config.sso_mode,
+            'sso_token_ttl': config.sso_token_ttl,
+            'dashboard_keep_alive': config.dashboard_keep_alive,
+        })
+    
+    @api.model
+    def _get_sso_url(self, config):
+        """Builds the dashboard SSO URL for the current user from cached config values
+        
+        In signed mode the URL carries a short-lived token minted locally
+        and keyed on the shared SSO secret, never the permanent credential.
+        """
+        if config['sso_mode'] == 'legacy':
+            token = config['api_key']
+        else:
+            user = self.env.user
+            token = sso_token.get_or_mint(
+                (self.env.cr.dbname, config['id'], user.id),
+                config['api_key'],
+                {
+                    'acc': config['account_id'],
+                    'sub': user.login,
+                    'email': user.email or user.login,
+                    'name': user.name,
+                    'db': self.env.cr.dbname,
+                },
+                ttl=config['sso_token_ttl'] or sso_token.DEFAULT_TTL,
+            )
+        return f"{config['platform_url']}/sso/odoo?token={token}"
+    
+    @api.model
+    def get_config(self):
+        """Returns the active configuration for the current company"""
+        values = self._get_config_values(self.env.company.id)
+        return self.browse(values['id']) if values else self.browse()
+    
+    @api.model
+    def get_dashboard_prefetch(self):
+        """Returns the dashboard URL to preload on menu hover, or False
+        
+        Only answers when the dashboard is kept alive: a preloaded frame that
+        is dropped on the first action switch would just waste an SSO round.
+        """
+        config = self._get_config_values(self.env.company.id)
+        if not config or not config['api_key'] or config['dashboard_keep_alive'] <= 0:
+            return False
+        return {
+            'url': self._get_sso_url(config),
+            'key': config['id'],
+            'keep_alive': config['dashboard_keep_alive'] * 60,
+        }
     
     def action_open_ssp(self):
         """Open SSP - if not configured, opens configuration"""
-        config = self.env['ssp.config'].get_config()
+        config = self.env['ssp.config']._get_config_values(self.env.company.id)
         
         # If no configuration exists, open configuration page
         if not config:
@@ -196,23 +638,25 @@ class SspConfig(models.Model):
             }
         
         # If there is no API key, show existing configuration
-        if not config.api_key:
+        if not config['api_key']:
             return {
                 'type': 'ir.actions.act_window',
                 'name': 'Configure Smart Solutions Platform',
                 'res_model': 'ssp.config',
-                'res_id': config.id,
+                'res_id': config['id'],
                 'view_mode': 'form',
                 'target': 'current',
             }
         
         # Everything configured - open dashboard
-        sso_url = f"{config.platform_url}/sso/odoo?token={config.api_key}"
+        sso_url = self._get_sso_url(config)
         
         return {
             'type': 'ir.actions.client',
             'tag': 'ssp_connector.dashboard',
             'params': {
                 'url': sso_url,
+                'key': config['id'],
+                'keep_alive': max(config['dashboard_keep_alive'], 0) * 60,
             }
         }
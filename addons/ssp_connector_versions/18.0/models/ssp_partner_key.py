@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+import logging
+
+from ..tools import partner_keys
+
+_logger = logging.getLogger(__name__)
+
+# Partners indexed per statement when the lookup is (re)built
+BUILD_CHUNK = 5000
+
+
+class SspPartnerKey(models.Model):
+    _name = 'ssp.partner.key'
+    _description = 'SSP Supplier Matching Key'
+    _rec_name = 'key'
+    _log_access = False
+
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Partner',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        readonly=True,
+        ondelete='cascade',
+        help='Company of the partner; empty for partners shared by all companies'
+    )
+
+    key_type = fields.Selection([
+        ('vat', 'VAT'),
+        ('iban', 'IBAN'),
+        ('name', 'Name')
+    ], string='Type', required=True, readonly=True)
+
+    key = fields.Char(string='Key', required=True, readonly=True)
+
+    # Keys are only kept for active commercial partners: contacts share the
+    # VAT of their company and would only add ambiguity.
+
+    def init(self):
+        create_index(self.env.cr, 'ssp_partner_key_type_key_index', 'ssp_partner_key', ['key_type', 'key'])
+        self.env.cr.execute("SELECT 1 FROM ssp_partner_key LIMIT 1")
+        if not self.env.cr.rowcount:
+            self._ssp_build()
+
+    @api.model
+    def _ssp_build(self):
+        """Indexes every partner, a chunk at a time"""
+        self.env.cr.execute("SELECT id FROM res_partner WHERE parent_id IS NULL AND active ORDER BY id")
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        Partner = self.env['res.partner'].sudo().with_context(active_test=False)
+        for i in range(0, len(ids), BUILD_CHUNK):
+            partners = Partner.browse(ids[i:i + BUILD_CHUNK])
+            self._ssp_refresh(partners)
+            partners.invalidate_recordset()
+        _logger.info(f'SSP supplier lookup built for {len(ids)} partners')
+
+    @api.model
+    def _ssp_refresh(self, partners):
+        """Recomputes the keys of ``partners`` with one delete and one insert"""
+        partners = partners.sudo().with_context(active_test=False).exists()
+        if not partners:
+            return
+        self.env.cr.execute("DELETE FROM ssp_partner_key WHERE partner_id = ANY(%s)", [partners.ids])
+        indexed = partners.filtered(lambda p: p.active and not p.parent_id)
+        if not indexed:
+            return
+        ibans = {}
+        for bank in self.env['res.partner.bank'].sudo().search([('partner_id', 'in', indexed.ids)]):
+            ibans.setdefault(bank.partner_id.id, set()).add(partner_keys.iban_key(bank.acc_number))
+
+        rows = set()
+        for partner in indexed:
+            company_id = partner.company_id.id or None
+            for vat in partner_keys.vat_keys(partner.vat):
+                rows.add((partner.id, company_id, 'vat', vat))
+            for iban in ibans.get(partner.id, ()):
+                if iban:
+                    rows.add((partner.id, company_id, 'iban', iban))
+            name = partner_keys.name_key(partner.name)
+            if name:
+                rows.add((partner.id, company_id, 'name', name))
+        if rows:
+            self.env.cr.execute("""
+                INSERT INTO ssp_partner_key (partner_id, company_id, key_type, key)
+                SELECT * FROM unnest(%s::int[], %s::int[], %s::varchar[], %s::varchar[])
+            """, [list(column) for column in zip(*rows)])
+        self.invalidate_model()
+
+    @api.model
+    def _ssp_match(self, company, partner_data):
+        """Resolves a batch of extracted suppliers with a single query
+
+        ``partner_data`` is a list of dicts with optional ``vat``, ``iban``
+        and ``name``. Returns a list of the same length holding the matched
+        partner, or an empty recordset. VAT wins over IBAN, IBAN over name.
+        """
+        wanted = []
+        for data in partner_data:
+            keys = [('vat', vat) for vat in partner_keys.vat_keys(data.get('vat'))]
+            iban, name = partner_keys.iban_key(data.get('iban')), partner_keys.name_key(data.get('name'))
+            if iban:
+                keys.append(('iban', iban))
+            if name:
+                keys.append(('name', name))
+            wanted.append(keys)
+
+        all_keys = {key for keys in wanted for key in keys}
+        found = {}
+        if all_keys:
+            key_types, keys = zip(*all_keys)
+            # Partners of the company first, then companies before individuals
+            self.env.cr.execute("""
+                SELECT k.key_type, k.key, k.partner_id
+                  FROM ssp_partner_key k
+                  JOIN res_partner p ON p.id = k.partner_id
+                 WHERE (k.key_type, k.key) IN (SELECT * FROM unnest(%s::varchar[], %s::varchar[]))
+                   AND (k.company_id IS NULL OR k.company_id = %s)
+              ORDER BY k.company_id IS NULL, p.is_company DESC, k.partner_id
+            """, [list(key_types), list(keys), company.id])
+            for key_type, key, partner_id in self.env.cr.fetchall():
+                found.setdefault((key_type, key), partner_id)
+
+        Partner = self.env['res.partner']
+        matched_ids = [next((found[key] for key in keys if key in found), None) for keys in wanted]
+        prefetch_ids = [partner_id for partner_id in matched_ids if partner_id]
+        return [
+            Partner.browse(partner_id).with_prefetch(prefetch_ids) if partner_id else Partner
+            for partner_id in matched_ids
+        ]
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from datetime import timedelta
+import base64
+import logging
+
+from ..tools import image_prep, metrics
+
+_logger = logging.getLogger(__name__)
+
+# Preprocessed files are only needed until their upload succeeded
+PREPARED_TTL = timedelta(days=7)
+
+
+class SspPreparedFile(models.Model):
+    _name = 'ssp.prepared.file'
+    _description = 'SSP Preprocessed Upload'
+    _rec_name = 'checksum'
+
+    checksum = fields.Char(
+        string='Source Checksum',
+        required=True,
+        readonly=True,
+        help='SHA1 of the original attachment content'
+    )
+
+    settings = fields.Char(
+        string='Settings',
+        required=True,
+        readonly=True,
+        help='Target DPI and JPEG quality the file was prepared with'
+    )
+
+    data = fields.Binary(
+        string='Prepared File',
+        attachment=True,
+        readonly=True,
+        help='Empty when preprocessing would not make the file smaller'
+    )
+
+    original_size = fields.Integer(string='Original Size', readonly=True)
+    file_size = fields.Integer(string='Prepared Size', readonly=True)
+
+    _sql_constraints = [
+        ('checksum_settings_unique', 'unique(checksum, settings)',
+         'A file is prepared once per settings!')
+    ]
+
+    @api.model
+    def _ssp_prepare(self, attachment, config):
+        """Returns (open_file, size) of the preprocessed ``attachment``, or None to send it as is
+
+        Results are cached by source checksum and settings, including the
+        files preprocessing could not shrink. The cache is written on a
+        cursor of its own: an upload that fails and is rolled back still
+        finds the prepared file when it is retried.
+        """
+        if not config.image_preprocessing or attachment.mimetype not in image_prep.MIMETYPES or not attachment.checksum:
+            return None
+        settings = f'{config.image_target_dpi}dpi/q{config.image_quality}'
+        try:
+            with self.env.registry.cursor() as cr:
+                Prepared = self.with_env(self.env(cr=cr, su=True))
+                prepared = Prepared.search([('checksum', '=', attachment.checksum), ('settings', '=', settings)], limit=1)
+                metrics.inc('ssp_cache_requests_total', cache='prepared', result='hit' if prepared else 'miss')
+                if not prepared:
+                    data = image_prep.preprocess(attachment.raw, config.image_target_dpi, config.image_quality)
+                    prepared = Prepared.create({
+                        'checksum': attachment.checksum,
+                        'settings': settings,
+                        'data': base64.b64encode(data) if data else False,
+                        'original_size': attachment.file_size,
+                        'file_size': len(data) if data else 0,
+                    })
+                    if data:
+                        _logger.info(f'SSP: {attachment.name} prepared, {attachment.file_size} -> {len(data)} bytes')
+                if not prepared.file_size:
+                    return None
+                stored = Prepared.env['ir.attachment'].search([
+                    ('res_model', '=', self._name),
+                    ('res_field', '=', 'data'),
+                    ('res_id', '=', prepared.id),
+                ], limit=1)
+                return stored._ssp_stream_source() if stored else None
+        except Exception as e:
+            _logger.warning(f'SSP: could not preprocess {attachment.name}, sending it as is: {str(e)}')
+            return None
+
+    @api.autovacuum
+    def _gc_prepared_files(self):
+        self.sudo().search([('create_date', '<', fields.Datetime.now() - PREPARED_TTL)]).unlink()
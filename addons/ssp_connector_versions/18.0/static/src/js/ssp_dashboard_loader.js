@@ -0,0 +1,20 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { LazyComponent } from "@web/core/assets";
+import { Component, xml } from "@odoo/owl";
+
+/**
+ * Client action stub kept in web.assets_backend: the dashboard itself lives
+ * in the ssp_connector.assets_dashboard bundle, fetched the first time the
+ * action runs.
+ */
+export class SSPDashboardLoader extends Component {
+    static components = { LazyComponent };
+    static template = xml`
+        <LazyComponent bundle="'ssp_connector.assets_dashboard'" Component="'ssp_connector.SSPDashboard'" props="props"/>
+    `;
+    static props = ["*"];
+}
+
+registry.category("actions").add("ssp_connector.dashboard", SSPDashboardLoader);
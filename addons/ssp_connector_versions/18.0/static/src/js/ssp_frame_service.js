@@ -0,0 +1,156 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+
+const MENU_SELECTOR = '[data-menu-xmlid="ssp_connector.menu_ssp_root"]';
+const HIDDEN_STYLE = "position: fixed; left: -10000px; top: 0; width: 1280px; height: 800px; visibility: hidden;";
+
+/**
+ * Keeps a single SSP iframe alive across action switches.
+ *
+ * The iframe lives in a fixed host appended to <body> and is never moved in
+ * the DOM (moving an iframe reloads it). While the dashboard action is shown
+ * the host is laid over the action's placeholder; when the user leaves it is
+ * parked off-screen, and evicted after `keepAlive` seconds of inactivity.
+ * Hovering the SSP menu creates the iframe ahead of the click.
+ */
+export const sspFrameService = {
+    dependencies: ["orm"],
+
+    start(env, { orm }) {
+        let host = null;
+        let iframe = null;
+        let frameKey = null;
+        let anchor = null;
+        let evictTimer = null;
+        let keepAlive = 0;
+        let prefetching = null;
+        const resizeObserver = new ResizeObserver(() => place());
+
+        function ensureHost() {
+            if (!host) {
+                host = document.createElement("div");
+                host.className = "o_ssp_frame_host";
+                host.setAttribute("style", HIDDEN_STYLE);
+                document.body.appendChild(host);
+            }
+            return host;
+        }
+
+        function ensureFrame(url, key) {
+            if (iframe && frameKey !== key) {
+                // Loaded for another configuration (e.g. the company was switched)
+                evict();
+            }
+            if (!iframe) {
+                frameKey = key;
+                iframe = document.createElement("iframe");
+                iframe.setAttribute("sandbox", "allow-scripts allow-same-origin allow-forms allow-popups allow-modals");
+                iframe.setAttribute("allow", "clipboard-read; clipboard-write; fullscreen");
+                iframe.setAttribute("allowfullscreen", "true");
+                iframe.setAttribute("frameborder", "0");
+                iframe.style.width = "100%";
+                iframe.style.height = "100%";
+                iframe.src = url;
+                ensureHost().appendChild(iframe);
+            }
+            return iframe;
+        }
+
+        function place() {
+            if (!host || !anchor) {
+                return;
+            }
+            const rect = anchor.getBoundingClientRect();
+            host.setAttribute(
+                "style",
+                `position: fixed; left: ${rect.left}px; top: ${rect.top}px; width: ${rect.width}px; height: ${rect.height}px; z-index: 1;`
+            );
+        }
+
+        function cancelEviction() {
+            clearTimeout(evictTimer);
+            evictTimer = null;
+        }
+
+        function evict() {
+            cancelEviction();
+            if (iframe) {
+                iframe.remove();
+                iframe = null;
+            }
+        }
+
+        function onWindowResize() {
+            place();
+        }
+
+        async function prefetch() {
+            if (iframe || prefetching) {
+                return;
+            }
+            prefetching = orm.silent.call("ssp.config", "get_dashboard_prefetch", []);
+            try {
+                const result = await prefetching;
+                if (result && !iframe) {
+                    keepAlive = result.keep_alive;
+                    ensureFrame(result.url, result.key);
+                    scheduleEviction();
+                }
+            } catch {
+                // Prefetching is best effort
+            } finally {
+                prefetching = null;
+            }
+        }
+
+        function scheduleEviction() {
+            cancelEviction();
+            if (!keepAlive) {
+                evict();
+            } else if (!anchor) {
+                evictTimer = setTimeout(evict, keepAlive * 1000);
+            }
+        }
+
+        document.addEventListener("mouseover", (ev) => {
+            if (ev.target.closest && ev.target.closest(MENU_SELECTOR)) {
+                prefetch();
+            }
+        });
+
+        return {
+            /**
+             * Shows the dashboard over `anchorEl`, reusing the live iframe if it
+             * was loaded for the same configuration (`options.key`).
+             */
+            show(url, anchorEl, options = {}) {
+                keepAlive = options.keepAlive || 0;
+                cancelEviction();
+                ensureFrame(url, options.key);
+                anchor = anchorEl;
+                resizeObserver.observe(anchor);
+                window.addEventListener("resize", onWindowResize);
+                place();
+            },
+            /**
+             * Parks the iframe off-screen and starts the idle eviction timer.
+             */
+            hide() {
+                if (anchor) {
+                    resizeObserver.unobserve(anchor);
+                }
+                window.removeEventListener("resize", onWindowResize);
+                anchor = null;
+                if (host) {
+                    host.setAttribute("style", HIDDEN_STYLE);
+                }
+                scheduleEviction();
+            },
+            evict,
+            prefetch,
+        };
+    },
+};
+
+registry.category("services").add("ssp_frame", sspFrameService);
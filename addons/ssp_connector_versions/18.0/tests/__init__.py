@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+from . import test_multipart
+from . import test_metrics
+from . import test_sso_token
+from . import test_partner_keys
+from . import test_ssp_results
+from . import test_pdf_data
+from . import test_circuit_breaker
+from . import test_outbox_claim
+from . import test_rate_limit
+from . import test_upload_session
+from . import test_delta_sync
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import BaseCase
+
+from odoo.addons.ssp_connector.tools import partner_keys
+
+
+class TestPartnerKeys(BaseCase):
+
+    def test_vat_keys(self):
+        self.assertEqual(partner_keys.vat_keys('PT 501.964.843'), ['PT501964843', '501964843'])
+        self.assertEqual(partner_keys.vat_keys('501964843'), ['501964843'])
+        self.assertEqual(partner_keys.vat_keys(' - '), [])
+        self.assertEqual(partner_keys.vat_keys(False), [])
+
+    def test_iban_key(self):
+        self.assertEqual(partner_keys.iban_key('pt50 0002 0123 1234 5678 9015 4'), 'PT50000201231234567890154')
+        self.assertIsNone(partner_keys.iban_key(None))
+
+    def test_name_key(self):
+        self.assertEqual(partner_keys.name_key('ACME, Lda.'), 'acme')
+        self.assertEqual(partner_keys.name_key('Acme'), 'acme')
+        self.assertEqual(partner_keys.name_key('Café Évora S.A.'), partner_keys.name_key('EVORA CAFE SA'))
+        self.assertEqual(partner_keys.name_key('Smart Solutions Platform'), 'platform smart solutions')
+        self.assertIsNone(partner_keys.name_key('S.A.'))
+        self.assertIsNone(partner_keys.name_key(False))
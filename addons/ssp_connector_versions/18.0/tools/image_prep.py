@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Shrinks scanned or photographed documents to what the SSP OCR needs"""
+import io
+
+from PIL import Image, ImageOps
+
+# Mimetypes handled; PDFs are sent untouched (rasterizing them needs a renderer Odoo does not ship)
+MIMETYPES = {'image/jpeg', 'image/png', 'image/tiff', 'image/bmp', 'image/webp'}
+
+# Longest side of an A4 page, in inches: bounds photos that carry no DPI
+PAGE_INCHES = 11.7
+
+# Deskew search: angles tried, in tenths of a degree, on a thumbnail this wide
+DESKEW_RANGE = 50
+DESKEW_STEP = 5
+DESKEW_WIDTH = 600
+
+
+def preprocess(data, target_dpi=200, quality=75):
+    """Returns ``data`` as a grayscale, straightened JPEG at ``target_dpi``, or None
+
+    None means the image could not be read or would not get smaller.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Exception:
+        return None
+    image = ImageOps.exif_transpose(image).convert('L')
+
+    dpi = image.info.get('dpi', (0, 0))[0] or 0
+    scale = target_dpi / dpi if dpi else 1.0
+    scale = min(scale, target_dpi * PAGE_INCHES / max(image.size), 1.0)
+    if scale < 1.0:
+        image = image.resize(
+            (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+            Image.LANCZOS
+        )
+
+    angle = skew_angle(image)
+    if angle:
+        image = image.rotate(angle, Image.BICUBIC, expand=True, fillcolor=255)
+
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality, optimize=True, dpi=(target_dpi, target_dpi))
+    result = output.getvalue()
+    return result if len(result) < len(data) else None
+
+
+def skew_angle(image):
+    """Estimates the rotation straightening the text lines, in degrees
+
+    Projection profile: ink is summed per row for each candidate rotation;
+    the profile is sharpest (largest jumps between rows) when the lines
+    are horizontal.
+    """
+    thumbnail = image.copy()
+    thumbnail.thumbnail((DESKEW_WIDTH, DESKEW_WIDTH * 2))
+    ink = thumbnail.point(lambda p: 255 if p < 128 else 0)
+    best_angle, best_score = 0, None
+    for tenths in range(-DESKEW_RANGE, DESKEW_RANGE + 1, DESKEW_STEP):
+        rotated = ink.rotate(tenths / 10, Image.NEAREST, fillcolor=0)
+        # A 1-pixel wide box resize averages every row: the projection profile
+        profile = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        score = sum((a - b) ** 2 for a, b in zip(profile, profile[1:]))
+        if best_score is None or score > best_score:
+            best_angle, best_score = tenths, score
+    return best_angle / 10
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import re
+import threading
+import time
+from collections import defaultdict
+
+# Latency histogram buckets, in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Per-process deltas are pushed to the shared ssp_metric table at most this often
+FLUSH_INTERVAL = 10
+
+# name: (type, help) of every metric family exposed on /ssp_connector/metrics
+FAMILIES = {
+    'ssp_request_duration_seconds': ('histogram', 'Latency of calls to the SSP platform'),
+    'ssp_request_errors_total': ('counter', 'Failed calls to the SSP platform by HTTP status'),
+    'ssp_cache_requests_total': ('counter', 'Connector cache lookups by result'),
+    'ssp_rate_limited_total': ('counter', 'Calls delayed (waited) or postponed (held) by the shared rate limit'),
+    'ssp_rate_limit_wait_seconds': ('histogram', 'Time calls waited for a rate limit token'),
+    'ssp_local_extractions_total': ('counter', 'Born-digital PDFs read locally, by embedded data kind'),
+    'ssp_outbox_messages': ('gauge', 'Outbox messages waiting (pending) or being sent (running)'),
+    'ssp_last_sync_age_seconds': ('gauge', 'Seconds since the last completed synchronization'),
+    'ssp_circuit_open': ('gauge', '1 while the circuit breaker of the platform is open'),
+}
+
+_lock = threading.Lock()
+_pending = defaultdict(float)
+_last_flush = [time.monotonic()]
+
+
+def format_labels(**labels):
+    return ','.join(
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in sorted(labels.items())
+    )
+
+
+def endpoint_label(endpoint):
+    """Collapses identifiers in a path so label cardinality stays bounded"""
+    return re.sub(r'/[^/]*\d[^/]*', '/:id', endpoint.split('?')[0])
+
+
+def inc(name, value=1, **labels):
+    with _lock:
+        _pending[(name, format_labels(**labels))] += value
+
+
+def observe(name, value, **labels):
+    """Adds one observation to a histogram (cumulative buckets, sum and count)"""
+    with _lock:
+        for bound in BUCKETS:
+            if value <= bound:
+                _pending[(f'{name}_bucket', format_labels(le=bound, **labels))] += 1
+        _pending[(f'{name}_bucket', format_labels(le='+Inf', **labels))] += 1
+        _pending[(f'{name}_sum', format_labels(**labels))] += value
+        _pending[(f'{name}_count', format_labels(**labels))] += 1
+
+
+def take(force=False):
+    """Returns and resets the pending deltas, or None when no flush is due"""
+    with _lock:
+        if not _pending or (not force and time.monotonic() - _last_flush[0] < FLUSH_INTERVAL):
+            return None
+        deltas = dict(_pending)
+        _pending.clear()
+        _last_flush[0] = time.monotonic()
+        return deltas
+
+
+def restore(deltas):
+    """Puts back deltas whose flush failed"""
+    with _lock:
+        for key, value in deltas.items():
+            _pending[key] += value
+
+
+def _family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def _sort_key(sample):
+    name, labels, _value = sample
+    le = re.search(r'le="([^"]+)"', labels)
+    bound = float('inf') if not le or le.group(1) == '+Inf' else float(le.group(1))
+    return (_family(name), re.sub(r',?le="[^"]+"', '', labels), name, bound)
+
+
+def render(samples):
+    """Renders (name, labels, value) samples in the Prometheus text format"""
+    lines = []
+    seen = set()
+    for name, labels, value in sorted(samples, key=_sort_key):
+        family = _family(name)
+        if family not in seen and family in FAMILIES:
+            seen.add(family)
+            kind, description = FAMILIES[family]
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {kind}')
+        value = int(value) if float(value).is_integer() else float(value)
+        lines.append(f'{name}{{{labels}}} {value}' if labels else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Normalization of the keys used to match extracted suppliers to partners"""
+import re
+import unicodedata
+
+# Legal forms dropped from names, so "ACME, Lda." and "Acme" share a key
+LEGAL_FORMS = {
+    'ab', 'ag', 'as', 'bv', 'co', 'corp', 'gmbh', 'inc', 'lda', 'limited', 'llc', 'ltd',
+    'nv', 'plc', 'sa', 'sarl', 'sas', 'sl', 'spa', 'srl', 'unipessoal',
+}
+
+
+def vat_keys(vat):
+    """Returns the keys of a VAT number: as written and without its country prefix"""
+    vat = re.sub(r'[^0-9A-Z]', '', (vat or '').upper())
+    if not vat:
+        return []
+    keys = [vat]
+    if re.match(r'^[A-Z]{2}[0-9A-Z]*\d', vat) and len(vat) > 4:
+        keys.append(vat[2:])
+    return keys
+
+
+def iban_key(iban):
+    return re.sub(r'[^0-9A-Z]', '', (iban or '').upper()) or None
+
+
+def name_key(name):
+    """Accent, case, punctuation and word order insensitive key of a company name"""
+    name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    # "S.A." and "Lda." must become single tokens before punctuation is dropped
+    name = re.sub(r'\b(\w)\.(?=\w\b)', r'\1', name)
+    words = set(re.findall(r'[a-z0-9]+', name)) - LEGAL_FORMS
+    return ' '.join(sorted(words)) or None
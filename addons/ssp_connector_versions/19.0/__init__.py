@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
+from . import tools
 from . import models
 from . import controllers
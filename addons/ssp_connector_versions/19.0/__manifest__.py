@@ -24,15 +24,24 @@ for automated invoice processing and data extraction.
     'author': 'Smart Solutions Platform',
     'website': 'https://smartsolutionsplatform.com',
     'license': 'OPL-1',
-    'depends': ['account'],
+    'depends': ['account', 'bus'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ssp_cron.xml',
         'views/ssp_dashboard_views.xml',  # Must load first (defines action_ssp_dashboard_server)
         'views/ssp_config_views.xml',
+        'views/ssp_outbox_views.xml',
+        'views/account_move_views.xml',
         'views/ssp_iframe_template.xml',
     ],
     'assets': {
         'web.assets_backend': [
+            'ssp_connector/static/src/js/ssp_frame_service.js',
+            'ssp_connector/static/src/js/ssp_dashboard_loader.js',
+            'ssp_connector/static/src/js/ssp_bill_updates.js',
+        ],
+        # Loaded on demand by the dashboard client action
+        'ssp_connector.assets_dashboard': [
             'ssp_connector/static/src/js/ssp_dashboard.js',
             'ssp_connector/static/src/xml/ssp_dashboard.xml',
         ],
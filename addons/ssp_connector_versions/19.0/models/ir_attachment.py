@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+import functools
+import io
+import os
+
+
+class IrAttachment(models.Model):
+    _inherit = 'ir.attachment'
+
+    def _ssp_stream_source(self):
+        """Returns (open_file, size) to stream the content without loading it
+
+        Filestore attachments are read straight from disk; only attachments
+        stored in the database have to be loaded in memory.
+        """
+        self.ensure_one()
+        if self.store_fname:
+            path = self._full_path(self.store_fname)
+            return functools.partial(open, path, 'rb'), os.path.getsize(path)
+        raw = self.raw or b''
+        return functools.partial(io.BytesIO, raw), len(raw)
+
+    def _ssp_upload_source(self, config):
+        """Returns (filename, open_file, size, mimetype) of the file to upload for this attachment
+
+        Images are replaced by their preprocessed version when the
+        configuration enables it and it is smaller.
+        """
+        self.ensure_one()
+        prepared = self.env['ssp.prepared.file']._ssp_prepare(self, config)
+        if prepared:
+            open_file, size = prepared
+            return f'{os.path.splitext(self.name)[0]}.jpg', open_file, size, 'image/jpeg'
+        open_file, size = self._ssp_stream_source()
+        return self.name, open_file, size, self.mimetype
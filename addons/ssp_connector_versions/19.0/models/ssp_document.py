@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+
+class SspDocument(models.Model):
+    _name = 'ssp.document'
+    _description = 'SSP Submitted Document'
+    _rec_name = 'checksum'
+    _order = 'id desc'
+
+    checksum = fields.Char(
+        string='Checksum',
+        required=True,
+        readonly=True,
+        help='SHA1 of the file content, as stored on ir.attachment'
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+
+    document_ref = fields.Char(
+        string='SSP Document',
+        readonly=True,
+        index=True
+    )
+
+    state = fields.Selection([
+        ('submitted', 'Submitted'),
+        ('done', 'Processed')
+    ], string='Status', default='submitted', required=True, readonly=True)
+
+    # The unique index also serves the (company_id, checksum) lookups
+    _company_checksum_unique = models.Constraint(
+        'unique(company_id, checksum)',
+        'A document can only be submitted once per company!',
+    )
+
+    @api.model
+    def _ssp_lookup(self, company, checksums):
+        """Returns {checksum: ssp.document} for the already submitted checksums"""
+        checksums = [c for c in set(checksums) if c]
+        if not checksums:
+            return {}
+        documents = self.sudo().search([
+            ('company_id', '=', company.id),
+            ('checksum', 'in', checksums)
+        ])
+        return {document.checksum: document for document in documents}
+
+    @api.model
+    def _ssp_register_submitted(self, company, refs_by_checksum):
+        """Remembers the checksums accepted by SSP with their document reference
+
+        Files submitted again because their cached result was evicted get
+        the new reference, so the result they wait for is recognized.
+        """
+        known = self._ssp_lookup(company, refs_by_checksum)
+        for checksum, document in known.items():
+            if document.document_ref != refs_by_checksum[checksum]:
+                document.write({'state': 'submitted', 'document_ref': refs_by_checksum[checksum]})
+        return self.sudo().create([{
+            'checksum': checksum,
+            'company_id': company.id,
+            'document_ref': document_ref,
+        } for checksum, document_ref in refs_by_checksum.items() if checksum and checksum not in known])
+
+    @api.model
+    def _ssp_store_results(self, company, results):
+        """Keeps the extraction results received for submitted documents in the cache"""
+        by_ref = {r['document_id']: r for r in results if r.get('document_id')}
+        if not by_ref:
+            return
+        documents = self.sudo().search([
+            ('company_id', '=', company.id),
+            ('document_ref', 'in', list(by_ref))
+        ])
+        to_cache = {}
+        for document in documents:
+            result = dict(by_ref[document.document_ref])
+            result.pop('move_id', None)
+            to_cache[document.checksum] = result
+        self.env['ssp.extraction.cache']._ssp_put_many(to_cache)
+        documents.filtered(lambda d: d.state != 'done').write({'state': 'done'})
+
+    @api.model
+    def _ssp_cached_results(self, documents):
+        """Returns {ssp.document: result} for the processed documents still in the cache"""
+        done = [document for document in documents if document.state == 'done']
+        cached = self.env['ssp.extraction.cache']._ssp_get_many([d.checksum for d in done])
+        return {document: cached[document.checksum] for document in done if document.checksum in cached}
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+import gzip
+import io
+import json
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = 2000
+# Approximate number of bill lines per uploaded JSONL chunk
+EXPORT_CHUNK_LINES = 5000
+# Posted vendor bills of a company after a given id, one row per product line
+EXPORT_QUERY = """
+    SELECT m.id, m.name, m.ref, m.move_type, m.invoice_date, m.invoice_date_due,
+           cur.name, m.amount_untaxed, m.amount_tax, m.amount_total,
+           m.partner_id, p.name, p.vat,
+           l.id, l.name, l.product_id, l.account_id, l.quantity, l.price_unit, l.discount,
+           l.price_subtotal, l.price_total,
+           ARRAY(SELECT r.account_tax_id FROM account_move_line_account_tax_rel r
+                  WHERE r.account_move_line_id = l.id ORDER BY r.account_tax_id)
+      FROM account_move m
+      JOIN res_currency cur ON cur.id = m.currency_id
+ LEFT JOIN res_partner p ON p.id = m.partner_id
+ LEFT JOIN account_move_line l ON l.move_id = m.id AND l.display_type = 'product'
+     WHERE m.company_id = %s
+       AND m.move_type IN ('in_invoice', 'in_refund')
+       AND m.state = 'posted'
+       AND m.id > %s
+     ORDER BY m.id, l.id
+"""
+
+
+class SspConfig(models.Model):
+    _inherit = 'ssp.config'
+
+    export_state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'In Progress'),
+        ('done', 'Done')
+    ], string='History Export', readonly=True, copy=False,
+        help='Export of the posted vendor bills to SSP, started when the company first connects')
+
+    export_last_id = fields.Integer(
+        string='Last Exported Bill',
+        readonly=True,
+        copy=False,
+        help='The history export resumes after this account.move id'
+    )
+
+    def write(self, vals):
+        newly_connected = self.browse()
+        if vals.get('state') == 'connected':
+            newly_connected = self.filtered(lambda c: c.state != 'connected' and not c.export_state)
+        res = super(SspConfig, self).write(vals)
+        if newly_connected:
+            newly_connected.write({'export_state': 'pending'})
+            self._ssp_trigger_history_export()
+        return res
+
+    @api.model
+    def _ssp_trigger_history_export(self):
+        cron = self.env.ref('ssp_connector.ir_cron_ssp_history_export', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_history_export(self):
+        """Continues the history export of every connected company that has one in progress
+
+        All companies share one time budget, within the cron time limit;
+        the cron re-triggers itself when it runs out.
+        """
+        deadline = time.monotonic() + self.env['ssp.outbox']._cron_time_budget()
+        for config in self.search([('state', '=', 'connected'), ('export_state', 'in', ('pending', 'running'))]):
+            if time.monotonic() > deadline:
+                self._ssp_trigger_history_export()
+                return
+            try:
+                config._ssp_export_history(deadline)
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.error(f'SSP history export failed for {config.company_id.name}: {str(e)}')
+
+    def _ssp_export_history(self, deadline, chunk_lines=EXPORT_CHUNK_LINES):
+        """Streams the posted vendor bills to SSP as gzipped JSONL chunks
+
+        Rows come from a named (server-side) cursor on a transaction of its
+        own, so memory stays flat whatever the history size and progress
+        can be committed after each chunk. export_last_id is advanced with
+        every accepted chunk: a failed or interrupted export resumes there.
+        Stops after the chunk that reaches ``deadline`` (a monotonic time).
+        """
+        self.ensure_one()
+        self.export_state = 'running'
+        self.env.cr.commit()
+        exported = 0
+
+        with self.env.registry.cursor() as cr:
+            moves = self._ssp_history_moves(cr, self.export_last_id)
+            for first_id, last_id, count, data in self._ssp_history_chunks(moves, chunk_lines):
+                response = self._ssp_request(
+                    'POST', '/api/odoo/history',
+                    data=data,
+                    headers={
+                        'Content-Type': 'application/x-ndjson',
+                        'Content-Encoding': 'gzip',
+                        # Chunks restart at the same bill when resuming: same key, applied once
+                        'Idempotency-Key': f'history-{self.account_id}-{first_id}-{last_id}',
+                    }
+                )
+                self._ssp_raise_for_status(response)
+                self.export_last_id = last_id
+                self.env.cr.commit()
+                exported += count
+                if time.monotonic() > deadline:
+                    _logger.info(f'SSP history export for {self.company_id.name}: {exported} bill(s) sent, continuing')
+                    self._ssp_trigger_history_export()
+                    return
+
+        self.export_state = 'done'
+        self.env.cr.commit()
+        _logger.info(f'SSP history export for {self.company_id.name} done: {exported} bill(s) sent')
+
+    def _ssp_history_moves(self, cr, after_id):
+        """Yields the bills after ``after_id`` as dicts with their lines, in id order"""
+        stream = cr._cnx.cursor(f'ssp_history_export_{self.id}')
+        stream.itersize = EXPORT_FETCH_SIZE
+        try:
+            stream.execute(EXPORT_QUERY, [self.company_id.id, after_id or 0])
+            move = None
+            for row in stream:
+                if move is None or move['id'] != row[0]:
+                    if move is not None:
+                        yield move
+                    move = {
+                        'id': row[0], 'name': row[1], 'ref': row[2], 'move_type': row[3],
+                        'invoice_date': row[4], 'invoice_date_due': row[5], 'currency': row[6],
+                        'amount_untaxed': row[7], 'amount_tax': row[8], 'amount_total': row[9],
+                        'partner': {'id': row[10], 'name': row[11], 'vat': row[12]} if row[10] else None,
+                        'lines': [],
+                    }
+                if row[13]:
+                    move['lines'].append({
+                        'id': row[13], 'name': row[14], 'product_id': row[15], 'account_id': row[16],
+                        'quantity': row[17], 'price_unit': row[18], 'discount': row[19],
+                        'price_subtotal': row[20], 'price_total': row[21], 'tax_ids': row[22],
+                    })
+            if move is not None:
+                yield move
+        finally:
+            stream.close()
+
+    @api.model
+    def _ssp_history_chunks(self, moves, chunk_lines):
+        """Packs streamed bills into gzipped JSONL chunks of about ``chunk_lines`` lines
+
+        Yields (first bill id, last bill id, bill count, gzip bytes); a bill
+        is never split across chunks.
+        """
+        buffer = io.BytesIO()
+        archive = gzip.GzipFile(fileobj=buffer, mode='wb')
+        first_id, count, lines = None, 0, 0
+        for move in moves:
+            archive.write(json.dumps(move, default=str, separators=(',', ':')).encode() + b'\n')
+            first_id = first_id or move['id']
+            count += 1
+            lines += len(move['lines']) or 1
+            if lines >= chunk_lines:
+                archive.close()
+                yield first_id, move['id'], count, buffer.getvalue()
+                buffer = io.BytesIO()
+                archive = gzip.GzipFile(fileobj=buffer, mode='wb')
+                first_id, count, lines = None, 0, 0
+        archive.close()
+        if count:
+            yield first_id, move['id'], count, buffer.getvalue()
+
+    def action_ssp_export_history(self):
+        """Restarts the history export from the first bill, in the background"""
+        self.write({'export_state': 'pending', 'export_last_id': 0})
+        self._ssp_trigger_history_export()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Smart Solutions Platform',
+                'message': 'History export started in the background.',
+                'type': 'info',
+                'sticky': False,
+            }
+        }
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+import logging
+
+from ..tools import metrics
+
+_logger = logging.getLogger(__name__)
+
+# Last ormcache counters seen by this process: {(dbname, method): (hit, miss)}
+_ormcache_seen = {}
+
+# ormcached methods reported as ssp_cache_requests_total{cache=...}
+ORMCACHE_METHODS = {
+    ('ssp.config', '_get_config_values'): 'config',
+}
+
+
+class SspMetric(models.Model):
+    _name = 'ssp.metric'
+    _description = 'SSP Connector Metric'
+    _log_access = False
+
+    name = fields.Char(string='Name', required=True, readonly=True)
+    labels = fields.Char(string='Labels', required=True, readonly=True, default='')
+    value = fields.Float(string='Value', readonly=True)
+
+    _name_labels_unique = models.Constraint(
+        'unique(name, labels)',
+        'A metric sample is stored once per label set!',
+    )
+
+    @api.model
+    def _ssp_flush(self, force=False):
+        """Adds the counters collected by this process to the shared table
+
+        Runs at most every metrics.FLUSH_INTERVAL seconds per process, in a
+        transaction of its own so a rollback of the caller loses nothing.
+        """
+        self._ssp_collect_ormcache_stats()
+        deltas = metrics.take(force=force)
+        if not deltas:
+            return
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute("""
+                    INSERT INTO ssp_metric (name, labels, value)
+                    SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::float8[])
+                    ON CONFLICT (name, labels) DO UPDATE SET value = ssp_metric.value + EXCLUDED.value
+                """, [
+                    [key[0] for key in deltas],
+                    [key[1] for key in deltas],
+                    list(deltas.values()),
+                ])
+        except Exception as e:
+            metrics.restore(deltas)
+            _logger.warning(f'Could not flush SSP metrics: {str(e)}')
+
+    @api.model
+    def _ssp_collect_ormcache_stats(self):
+        try:
+            from odoo.tools.cache import STAT
+        except ImportError:
+            return
+        dbname = self.env.cr.dbname
+        for key, counter in list(STAT.items()):
+            if len(key) < 3 or key[0] != dbname:
+                continue
+            cache = ORMCACHE_METHODS.get((key[1], getattr(key[2], '__name__', None)))
+            if not cache:
+                continue
+            hit, miss = getattr(counter, 'hit', 0), getattr(counter, 'miss', 0)
+            last_hit, last_miss = _ormcache_seen.get((dbname, cache), (0, 0))
+            # Counters restart from zero when the registry is reloaded
+            if hit < last_hit or miss < last_miss:
+                last_hit, last_miss = 0, 0
+            if hit > last_hit:
+                metrics.inc('ssp_cache_requests_total', hit - last_hit, cache=cache, result='hit')
+            if miss > last_miss:
+                metrics.inc('ssp_cache_requests_total', miss - last_miss, cache=cache, result='miss')
+            _ormcache_seen[(dbname, cache)] = (hit, miss)
+
+    @api.model
+    def _ssp_render(self):
+        """Returns every connector metric in the Prometheus text format"""
+        self._ssp_flush(force=True)
+        cr = self.env.cr
+        cr.execute("SELECT name, labels, value FROM ssp_metric")
+        samples = cr.fetchall()
+
+        cr.execute("""
+            SELECT operation, priority, state, count(*) FROM ssp_outbox
+             WHERE state IN ('pending', 'running')
+             GROUP BY operation, priority, state
+        """)
+        samples += [
+            ('ssp_outbox_messages', metrics.format_labels(operation=operation, priority=priority, state=state), count)
+            for operation, priority, state, count in cr.fetchall()
+        ]
+
+        cr.execute("""
+            SELECT c.company_id, p.name,
+                   EXTRACT(EPOCH FROM (now() at time zone 'UTC') - c.last_sync)
+              FROM ssp_config c
+              JOIN res_company p ON p.id = c.company_id
+             WHERE c.active AND c.last_sync IS NOT NULL
+        """)
+        samples += [
+            ('ssp_last_sync_age_seconds', metrics.format_labels(company_id=company_id, company=name), age)
+            for company_id, name, age in cr.fetchall()
+        ]
+
+        cr.execute("SELECT platform_url, state FROM ssp_circuit_breaker")
+        samples += [
+            ('ssp_circuit_open', metrics.format_labels(platform_url=url), 1 if state == 'open' else 0)
+            for url, state in cr.fetchall()
+        ]
+        return metrics.render(samples)
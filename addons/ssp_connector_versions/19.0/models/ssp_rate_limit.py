@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+import logging
+import time
+
+from ..tools import metrics
+from ..tools.ssp_client import SspThrottledError
+
+_logger = logging.getLogger(__name__)
+
+# Platform-wide budget shared by every worker, in calls per second (0 disables it)
+DEFAULT_GLOBAL_RATE = 20.0
+# Seconds of budget a bucket holds, i.e. the burst allowed after a quiet period
+BURST_SECONDS = 2.0
+# Longest a call waits for a token in-process; beyond, the outbox holds the message
+MAX_WAIT = 5.0
+
+
+class SspRateLimit(models.Model):
+    _name = 'ssp.rate.limit'
+    _description = 'SSP Rate Limit'
+    _rec_name = 'key'
+
+    key = fields.Char(
+        string='Bucket',
+        required=True,
+        readonly=True,
+        help='global:<platform URL> or company:<company id>'
+    )
+
+    rate = fields.Float(string='Calls per Second', readonly=True)
+    capacity = fields.Float(string='Burst', readonly=True)
+    tokens = fields.Float(
+        string='Tokens',
+        readonly=True,
+        help='Calls available at the last refill; negative while the platform asked to back off'
+    )
+    refilled_at = fields.Datetime(string='Refilled At', readonly=True)
+
+    _key_unique = models.Constraint(
+        'unique(key)',
+        'Only one rate limit bucket per key is allowed!',
+    )
+
+    # Token buckets shared by every worker and cron thread through their
+    # rows. Like the circuit breaker, they are updated in short transactions
+    # of their own so a call never waits on the caller's transaction.
+
+    @api.model
+    def _ssp_buckets(self, config):
+        """Returns [(key, rate)] of the buckets a call of ``config`` draws from"""
+        global_rate = float(self.env['ir.config_parameter'].sudo().get_param(
+            'ssp_connector.rate_limit', DEFAULT_GLOBAL_RATE
+        ))
+        buckets = []
+        if global_rate > 0:
+            buckets.append((f'global:{config.platform_url}', global_rate))
+        if config.rate_limit > 0:
+            buckets.append((f'company:{config.company_id.id}', config.rate_limit))
+        return buckets
+
+    @api.model
+    def _ssp_acquire(self, config):
+        """Takes one token from every bucket of ``config``, waiting for them if needed
+
+        Raises SspThrottledError when the wait would exceed MAX_WAIT.
+        """
+        buckets = self._ssp_buckets(config)
+        if not buckets:
+            return
+        waited = 0.0
+        while True:
+            wait = self._ssp_take(buckets)
+            if not wait:
+                break
+            if waited + wait > MAX_WAIT:
+                metrics.inc('ssp_rate_limited_total', result='held')
+                raise SspThrottledError(wait)
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            metrics.inc('ssp_rate_limited_total', result='waited')
+            metrics.observe('ssp_rate_limit_wait_seconds', waited)
+
+    @api.model
+    def _ssp_take(self, buckets):
+        """Takes one token from all ``buckets`` at once, or none
+
+        Returns 0 when the tokens were taken, else the seconds until the
+        emptiest bucket refills one.
+        """
+        with self.env.registry.cursor() as cr:
+            rows = self._ssp_lock_rows(cr, buckets)
+            if all(row['available'] >= 1 for row in rows):
+                cr.execute("""
+                    UPDATE ssp_rate_limit b
+                       SET tokens = t.available - 1, refilled_at = clock_timestamp() at time zone 'UTC'
+                      FROM unnest(%s::int[], %s::float[]) AS t(id, available)
+                     WHERE b.id = t.id
+                """, [[row['id'] for row in rows], [row['available'] for row in rows]])
+                return 0
+            return max((1 - row['available']) / row['rate'] for row in rows if row['available'] < 1)
+
+    @api.model
+    def _ssp_backoff(self, config, retry_in):
+        """Empties the buckets of ``config`` for ``retry_in`` seconds, after a 429 of the platform
+
+        The debt is shared: no worker calls the platform again before the
+        delay it asked for.
+        """
+        buckets = self._ssp_buckets(config)
+        if not buckets:
+            return
+        with self.env.registry.cursor() as cr:
+            rows = self._ssp_lock_rows(cr, buckets)
+            cr.execute("""
+                UPDATE ssp_rate_limit
+                   SET tokens = LEAST(tokens, -rate * %s), refilled_at = clock_timestamp() at time zone 'UTC'
+                 WHERE id = ANY(%s)
+            """, [retry_in, [row['id'] for row in rows]])
+        _logger.warning(f'SSP platform throttled {config.company_id.name}, backing off {retry_in:.1f}s')
+
+    @api.model
+    def _ssp_lock_rows(self, cr, buckets):
+        """Locks the ``buckets`` rows, in key order, and returns their refilled token counts"""
+        keys = [key for key, _rate in buckets]
+        rates = [rate for _key, rate in buckets]
+        cr.execute("""
+            INSERT INTO ssp_rate_limit (key, rate, capacity, tokens, refilled_at)
+            SELECT key, rate, GREATEST(rate * %s, 1), GREATEST(rate * %s, 1), clock_timestamp() at time zone 'UTC'
+              FROM unnest(%s::varchar[], %s::float[]) AS t(key, rate)
+            ON CONFLICT (key) DO NOTHING
+        """, [BURST_SECONDS, BURST_SECONDS, keys, rates])
+        cr.execute("""
+            SELECT b.id, t.rate,
+                   LEAST(GREATEST(t.rate * %s, 1), b.tokens + t.rate *
+                         EXTRACT(EPOCH FROM (clock_timestamp() at time zone 'UTC') - b.refilled_at)) AS available
+              FROM ssp_rate_limit b
+              JOIN unnest(%s::varchar[], %s::float[]) AS t(key, rate) ON t.key = b.key
+             ORDER BY b.key
+               FOR UPDATE OF b
+        """, [BURST_SECONDS, keys, rates])
+        rows = cr.dictfetchall()
+        # Budgets changed in the settings apply from now on
+        cr.execute("""
+            UPDATE ssp_rate_limit b
+               SET rate = t.rate, capacity = GREATEST(t.rate * %s, 1)
+              FROM unnest(%s::varchar[], %s::float[]) AS t(key, rate)
+             WHERE b.key = t.key AND b.rate != t.rate
+        """, [BURST_SECONDS, keys, rates])
+        return rows
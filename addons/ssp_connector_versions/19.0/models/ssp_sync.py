@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+import json
+import logging
+import requests
+
+_logger = logging.getLogger(__name__)
+
+# Records sent per outbox message during a delta pass
+SYNC_PAGE_SIZE = 500
+
+# write_date is the start time of the writing transaction: a pass stops this
+# many seconds before the database clock, longer than any transaction lasts,
+# so rows of transactions still running are never left behind
+SYNC_SAFETY_LAG = 900
+
+# Models sent by the delta sync: table, company filter and fields sent to SSP
+SYNC_MODELS = {
+    'res.partner': {
+        'table': 'res_partner',
+        'where': '(company_id = %(company_id)s OR company_id IS NULL)',
+        'fields': ['name', 'vat', 'email', 'is_company', 'country_id', 'active'],
+    },
+    'account.move': {
+        'table': 'account_move',
+        'where': "company_id = %(company_id)s AND move_type IN ('in_invoice', 'in_refund')",
+        'fields': ['name', 'ref', 'move_type', 'state', 'partner_id', 'invoice_date',
+                   'invoice_date_due', 'currency_id', 'amount_untaxed', 'amount_total', 'ssp_document_ref'],
+    },
+    'ir.attachment': {
+        'table': 'ir_attachment',
+        'where': "res_model = 'account.move' AND company_id = %(company_id)s",
+        'fields': ['name', 'mimetype', 'checksum', 'file_size', 'res_id'],
+    },
+}
+
+
+class SspConfig(models.Model):
+    _inherit = 'ssp.config'
+
+    sync_cursor = fields.Json(
+        string='Synchronization Cursor',
+        readonly=True,
+        copy=False,
+        help='Keyset position of the delta synchronization pass in progress'
+    )
+
+    def init(self):
+        # Keyset pagination on (write_date, id) must be an index range scan
+        create_index(self.env.cr, 'res_partner_ssp_write_date_id_index', 'res_partner', ['write_date', 'id'])
+        create_index(self.env.cr, 'account_move_ssp_write_date_id_index', 'account_move', ['write_date', 'id'])
+        create_index(self.env.cr, 'ir_attachment_ssp_write_date_id_index', 'ir_attachment', ['write_date', 'id'],
+                     where="res_model = 'account.move'")
+
+    @api.model
+    def _cron_delta_sync(self):
+        """Runs a delta synchronization pass for every connected company"""
+        for config in self.search([('state', '=', 'connected')]):
+            try:
+                config._ssp_delta_sync()
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.error(f'SSP delta sync failed for {config.company_id.name}: {str(e)}')
+
+    def _ssp_delta_sync(self, page_size=SYNC_PAGE_SIZE):
+        """Queues every record changed since last_sync, one page per outbox message
+
+        The pass covers the window ]last_sync, until], ``until`` being the
+        database clock at pass start minus SYNC_SAFETY_LAG. Each page is
+        queued in the same transaction that advances the keyset cursor, so a
+        crash resumes after the last committed page without gaps or replays.
+        last_sync only moves to ``until`` once every model is done.
+        """
+        self.ensure_one()
+        cursor = json.loads(json.dumps(self.sync_cursor or {}))
+        if not cursor.get('until'):
+            self.env.cr.execute(
+                "SELECT (clock_timestamp() at time zone 'UTC') - make_interval(secs => %s)", [SYNC_SAFETY_LAG]
+            )
+            until = self.env.cr.fetchone()[0]
+            if self.last_sync and until <= self.last_sync:
+                return
+            cursor = {'until': fields.Datetime.to_string(until), 'positions': {}}
+        since = fields.Datetime.to_string(self.last_sync) if self.last_sync else '1970-01-01 00:00:00'
+        Outbox = self.env['ssp.outbox']
+        pages = 0
+
+        for model_name in SYNC_MODELS:
+            position = cursor['positions'].get(model_name) or [since, 0]
+            while True:
+                rows = self._ssp_sync_page(model_name, position, cursor['until'], page_size)
+                if not rows:
+                    break
+                records = self.env[model_name].sudo().with_context(active_test=False).browse([r[0] for r in rows])
+                Outbox._enqueue(self, 'sync', {
+                    'model': model_name,
+                    'records': self._ssp_sync_values(records, SYNC_MODELS[model_name]['fields']),
+                }, priority='backfill')
+                position = [fields.Datetime.to_string(rows[-1][1]), rows[-1][0]]
+                cursor['positions'][model_name] = position
+                self.sync_cursor = json.loads(json.dumps(cursor))
+                self.env.cr.commit()
+                pages += 1
+
+        self.write({
+            'last_sync': cursor['until'],
+            'sync_cursor': False,
+        })
+        self.env.cr.commit()
+        _logger.info(f'SSP delta sync for {self.company_id.name}: {pages} page(s) queued')
+
+    def _ssp_sync_page(self, model_name, position, until, limit):
+        """Returns the next (id, write_date) rows after ``position``, in keyset order"""
+        spec = SYNC_MODELS[model_name]
+        self.env.cr.execute(f"""
+            SELECT id, write_date FROM {spec['table']}
+             WHERE {spec['where']}
+               AND (write_date, id) > (%(after_date)s, %(after_id)s)
+               AND write_date <= %(until)s
+             ORDER BY write_date, id
+             LIMIT %(limit)s
+        """, {
+            'company_id': self.company_id.id,
+            'after_date': position[0],
+            'after_id': position[1],
+            'until': until,
+            'limit': limit,
+        })
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _ssp_sync_values(self, records, field_names):
+        """Reads records into JSON-safe dicts (dates as ISO strings, many2one as id)"""
+        values = []
+        for row in records.read(field_names):
+            for name, value in row.items():
+                if isinstance(value, tuple):
+                    row[name] = value[0]
+            values.append(row)
+        return json.loads(json.dumps(values, default=str))
+
+    def _ssp_outbox_sync(self, job):
+        """Outbox handler: pushes one page of changed records to SSP"""
+        self.ensure_one()
+        try:
+            response = self._ssp_request(
+                'POST', '/api/odoo/sync',
+                json=job.payload,
+                headers={'Idempotency-Key': job.idempotency_key}
+            )
+        except requests.exceptions.RequestException as e:
+            raise Exception(f'Connection error: {str(e)}')
+        self._ssp_raise_for_status(response)
+
+    def action_ssp_sync(self):
+        """Runs the delta synchronization in the background right away"""
+        cron = self.env.ref('ssp_connector.ir_cron_ssp_delta_sync', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Smart Solutions Platform',
+                'message': 'Synchronization started in the background.',
+                'type': 'info',
+                'sticky': False,
+            }
+        }
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from datetime import timedelta
+import base64
+import hashlib
+import logging
+
+from ..tools.ssp_client import SspPermanentError
+
+_logger = logging.getLogger(__name__)
+
+# Size of each PUT of a resumable upload
+CHUNK_SIZE = 4 * 1024 * 1024
+# Status SSP answers a chunk whose Upload-Checksum does not match with
+CHECKSUM_MISMATCH = 460
+# Sessions are dropped once the platform would have expired them anyway
+SESSION_TTL = timedelta(days=3)
+# Offset conflicts (409) resolved in a row before the message is retried later
+MAX_CONFLICTS = 3
+
+
+class SspUploadSession(models.Model):
+    _name = 'ssp.upload.session'
+    _description = 'SSP Resumable Upload'
+    _rec_name = 'filename'
+    _order = 'id desc'
+
+    config_id = fields.Many2one(
+        'ssp.config',
+        string='Configuration',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+
+    attachment_id = fields.Many2one(
+        'ir.attachment',
+        string='Attachment',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+
+    checksum = fields.Char(
+        string='Checksum',
+        required=True,
+        readonly=True,
+        help='SHA1 of the uploaded content'
+    )
+
+    filename = fields.Char(string='File Name', readonly=True)
+    size = fields.Integer(string='Size', readonly=True)
+    chunk_size = fields.Integer(string='Chunk Size', readonly=True)
+
+    upload_ref = fields.Char(
+        string='Upload Reference',
+        readonly=True,
+        help='Upload session id returned by SSP'
+    )
+
+    offset = fields.Integer(
+        string='Acknowledged Offset',
+        readonly=True,
+        help='Bytes SSP confirmed having received; the upload resumes there'
+    )
+
+    state = fields.Selection([
+        ('open', 'In Progress'),
+        ('complete', 'Complete')
+    ], string='Status', default='open', required=True, readonly=True)
+
+    _config_attachment_checksum_unique = models.Constraint(
+        'unique(config_id, attachment_id, checksum)',
+        'Only one upload session per file is allowed!',
+    )
+
+    # Sessions are read and written on a cursor of their own: the progress
+    # of an upload survives the rollback of the outbox message sending it.
+
+    @api.model
+    def _ssp_upload(self, config, attachment, filename, open_file, size, mimetype):
+        """Sends a large file in checksummed chunks and returns its SSP upload id
+
+        Resumes from the offset SSP acknowledged last, whether the previous
+        attempt died with its worker or timed out.
+        """
+        checksum = self._ssp_file_checksum(open_file)
+        with self.env.registry.cursor() as cr:
+            Session = self.with_env(self.env(cr=cr, su=True))
+            session = Session.search([
+                ('config_id', '=', config.id),
+                ('attachment_id', '=', attachment.id),
+                ('checksum', '=', checksum),
+            ], limit=1)
+            if not session:
+                session = Session.create({
+                    'config_id': config.id,
+                    'attachment_id': attachment.id,
+                    'checksum': checksum,
+                    'filename': filename,
+                    'size': size,
+                    'chunk_size': CHUNK_SIZE,
+                })
+            cr.commit()
+            if session.state != 'complete':
+                session._ssp_send(config, open_file, mimetype)
+            return session.upload_ref
+
+    def _ssp_send(self, config, open_file, mimetype):
+        self.ensure_one()
+        offset = self._ssp_resume_offset(config, mimetype)
+        conflicts = 0
+        with open_file() as f:
+            f.seek(offset)
+            while offset < self.size:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    raise SspPermanentError(f'{self.filename} is shorter than announced ({offset}/{self.size} bytes)')
+                response = config._ssp_request(
+                    'PUT', f'/api/odoo/uploads/{self.upload_ref}',
+                    data=chunk,
+                    headers={
+                        'Content-Type': 'application/offset+octet-stream',
+                        'Upload-Offset': str(offset),
+                        'Upload-Checksum': f'sha1 {base64.b64encode(hashlib.sha1(chunk).digest()).decode()}',
+                    }
+                )
+                if response.status_code == 409:
+                    # Offsets disagree (e.g. an acknowledgement got lost): continue where SSP is.
+                    # A conflict that does not move the offset is left to the outbox retries.
+                    server_offset = self._ssp_server_offset(config)
+                    if server_offset is None:
+                        raise Exception(f'SSP upload session of {self.filename} expired, restarting it')
+                    conflicts += 1
+                    if server_offset == offset or conflicts > MAX_CONFLICTS:
+                        raise Exception(f'SSP keeps refusing the chunk of {self.filename} at {offset} '
+                                        f'(acknowledged offset {server_offset})')
+                    offset = server_offset
+                    f.seek(offset)
+                    continue
+                if response.status_code == CHECKSUM_MISMATCH:
+                    # Corrupted in transit: retried with the message, from the same offset
+                    raise Exception(f'SSP rejected the chunk of {self.filename} at {offset}: checksum mismatch')
+                config._ssp_raise_for_status(response)
+                offset = int(response.json().get('offset', offset + len(chunk)))
+                conflicts = 0
+                self.offset = offset
+                self.env.cr.commit()
+        self.state = 'complete'
+        self.env.cr.commit()
+        _logger.info(f'SSP resumable upload of {self.filename} complete ({self.size} bytes)')
+
+    def _ssp_resume_offset(self, config, mimetype):
+        """Returns the offset to send from, opening the session on SSP when needed"""
+        if self.upload_ref:
+            offset = self._ssp_server_offset(config)
+            if offset is not None:
+                if offset:
+                    _logger.info(f'SSP upload of {self.filename} resumed at {offset}/{self.size} bytes')
+                return offset
+        response = config._ssp_request('POST', '/api/odoo/uploads', json={
+            'filename': self.filename,
+            'size': self.size,
+            'checksum': self.checksum,
+            'mimetype': mimetype,
+            'chunk_size': self.chunk_size,
+        })
+        config._ssp_raise_for_status(response)
+        self.write({'upload_ref': response.json()['upload_id'], 'offset': 0})
+        self.env.cr.commit()
+        return 0
+
+    def _ssp_server_offset(self, config):
+        """Returns the offset acknowledged by SSP, or None if it forgot the session"""
+        response = config._ssp_request('GET', f'/api/odoo/uploads/{self.upload_ref}')
+        if response.status_code in (404, 410):
+            return None
+        config._ssp_raise_for_status(response)
+        return int(response.json().get('offset', 0))
+
+    @api.model
+    def _ssp_file_checksum(self, open_file):
+        digest = hashlib.sha1()
+        with open_file() as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @api.autovacuum
+    def _gc_upload_sessions(self):
+        self.sudo().search([('create_date', '<', fields.Datetime.now() - SESSION_TTL)]).unlink()
@@ -0,0 +1,66 @@
+/** @odoo-module **/
+
+import { patch } from "@web/core/utils/patch";
+import { useService } from "@web/core/utils/hooks";
+import { FormController } from "@web/views/form/form_controller";
+import { ListController } from "@web/views/list/list_controller";
+import { onMounted, onWillUnmount } from "@odoo/owl";
+
+const NOTIFICATION = "ssp_connector/bills_updated";
+// Results of consecutive batches arriving together trigger a single reload
+const RELOAD_DELAY = 500;
+
+/**
+ * Subscribes a vendor bill view to the SSP result notifications of the bus.
+ *
+ * The server sends one notification per user and result batch, listing the
+ * bills it updated; `reload` is called (once per burst) when one of them is
+ * on screen. Views being edited are left alone.
+ */
+function useSspBillUpdates(controller, reload) {
+    if (controller.props.resModel !== "account.move") {
+        return;
+    }
+    const busService = useService("bus_service");
+    const updated = new Set();
+    let timer = null;
+
+    const onUpdate = ({ move_ids }) => {
+        move_ids.forEach((id) => updated.add(id));
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            const ids = [...updated];
+            updated.clear();
+            reload(ids);
+        }, RELOAD_DELAY);
+    };
+    onMounted(() => busService.subscribe(NOTIFICATION, onUpdate));
+    onWillUnmount(() => {
+        clearTimeout(timer);
+        busService.unsubscribe(NOTIFICATION, onUpdate);
+    });
+}
+
+patch(FormController.prototype, {
+    setup() {
+        super.setup(...arguments);
+        useSspBillUpdates(this, async (ids) => {
+            const record = this.model.root;
+            if (ids.includes(record.resId) && !(await record.isDirty())) {
+                await record.load();
+            }
+        });
+    },
+});
+
+patch(ListController.prototype, {
+    setup() {
+        super.setup(...arguments);
+        useSspBillUpdates(this, async (ids) => {
+            const list = this.model.root;
+            if (!list.editedRecord && (list.records || []).some((record) => ids.includes(record.resId))) {
+                await list.load();
+            }
+        });
+    },
+});
@@ -1,11 +1,18 @@
 /** @odoo-module **/
 
 import { registry } from "@web/core/registry";
-import { Component } from "@odoo/owl";
+import { useService } from "@web/core/utils/hooks";
+import { Component, onMounted, onWillUnmount, useRef } from "@odoo/owl";
 
 export class SSPDashboard extends Component {
     setup() {
-        console.log("SSP Dashboard Initialized with URL:", this.props.action.params.url);
+        this.frame = useService("ssp_frame");
+        this.frameAnchor = useRef("frameAnchor");
+        onMounted(() => {
+            const { key, keep_alive } = this.props.action.params;
+            this.frame.show(this.url, this.frameAnchor.el, { key, keepAlive: keep_alive });
+        });
+        onWillUnmount(() => this.frame.hide());
     }
 
     get url() {
@@ -19,4 +26,4 @@ export class SSPDashboard extends Component {
 
 SSPDashboard.template = "ssp_connector.SSPDashboard";
 
-registry.category("actions").add("ssp_connector.dashboard", SSPDashboard);
+registry.category("lazy_components").add("ssp_connector.SSPDashboard", SSPDashboard);
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import BaseCase
+
+from odoo.addons.ssp_connector.tools import pdf_data
+
+CII = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rsm:CrossIndustryInvoice xmlns:rsm="urn:un:unece:uncefact:data:standard:CrossIndustryInvoice:100"
+    xmlns:ram="urn:un:unece:uncefact:data:standard:ReusableAggregateBusinessInformationEntity:100"
+    xmlns:udt="urn:un:unece:uncefact:data:standard:UnqualifiedDataType:100">
+  <rsm:ExchangedDocument>
+    <ram:ID>FT 2024/17</ram:ID>
+    <ram:IssueDateTime><udt:DateTimeString format="102">20240115</udt:DateTimeString></ram:IssueDateTime>
+  </rsm:ExchangedDocument>
+  <rsm:SupplyChainTradeTransaction>
+    <ram:IncludedSupplyChainTradeLineItem>
+      <ram:SpecifiedTradeProduct><ram:Name>Paper</ram:Name></ram:SpecifiedTradeProduct>
+      <ram:SpecifiedLineTradeAgreement>
+        <ram:NetPriceProductTradePrice><ram:ChargeAmount>4.50</ram:ChargeAmount></ram:NetPriceProductTradePrice>
+      </ram:SpecifiedLineTradeAgreement>
+      <ram:SpecifiedLineTradeDelivery><ram:BilledQuantity unitCode="C62">10</ram:BilledQuantity></ram:SpecifiedLineTradeDelivery>
+      <ram:SpecifiedLineTradeSettlement>
+        <ram:ApplicableTradeTax><ram:RateApplicablePercent>23</ram:RateApplicablePercent></ram:ApplicableTradeTax>
+        <ram:SpecifiedTradeSettlementLineMonetarySummation>
+          <ram:LineTotalAmount>45.00</ram:LineTotalAmount>
+        </ram:SpecifiedTradeSettlementLineMonetarySummation>
+      </ram:SpecifiedLineTradeSettlement>
+    </ram:IncludedSupplyChainTradeLineItem>
+    <ram:ApplicableHeaderTradeAgreement>
+      <ram:SellerTradeParty>
+        <ram:Name>Acme, Lda.</ram:Name>
+        <ram:SpecifiedTaxRegistration><ram:ID schemeID="VA">PT501964843</ram:ID></ram:SpecifiedTaxRegistration>
+      </ram:SellerTradeParty>
+    </ram:ApplicableHeaderTradeAgreement>
+    <ram:ApplicableHeaderTradeSettlement>
+      <ram:InvoiceCurrencyCode>EUR</ram:InvoiceCurrencyCode>
+      <ram:SpecifiedTradePaymentTerms>
+        <ram:DueDateDateTime><udt:DateTimeString format="102">20240214</udt:DateTimeString></ram:DueDateDateTime>
+      </ram:SpecifiedTradePaymentTerms>
+      <ram:SpecifiedTradeSettlementHeaderMonetarySummation>
+        <ram:LineTotalAmount>45.00</ram:LineTotalAmount>
+        <ram:TaxBasisTotalAmount>45.00</ram:TaxBasisTotalAmount>
+      </ram:SpecifiedTradeSettlementHeaderMonetarySummation>
+    </ram:ApplicableHeaderTradeSettlement>
+  </rsm:SupplyChainTradeTransaction>
+</rsm:CrossIndustryInvoice>
+"""
+
+UBL = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"
+    xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"
+    xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+  <cbc:ID>INV-9</cbc:ID>
+  <cbc:IssueDate>2024-03-01</cbc:IssueDate>
+  <cbc:DueDate>2024-03-31</cbc:DueDate>
+  <cbc:DocumentCurrencyCode>USD</cbc:DocumentCurrencyCode>
+  <cac:AccountingSupplierParty><cac:Party>
+    <cac:PartyName><cbc:Name>Globex</cbc:Name></cac:PartyName>
+    <cac:PartyTaxScheme><cbc:CompanyID>US123</cbc:CompanyID></cac:PartyTaxScheme>
+  </cac:Party></cac:AccountingSupplierParty>
+  <cac:InvoiceLine>
+    <cbc:InvoicedQuantity unitCode="C62">2</cbc:InvoicedQuantity>
+    <cac:Item><cbc:Name>Consulting</cbc:Name></cac:Item>
+    <cac:Price><cbc:PriceAmount currencyID="USD">100</cbc:PriceAmount></cac:Price>
+  </cac:InvoiceLine>
+  <cac:LegalMonetaryTotal>
+    <cbc:LineExtensionAmount currencyID="USD">200</cbc:LineExtensionAmount>
+    <cbc:TaxExclusiveAmount currencyID="USD">200</cbc:TaxExclusiveAmount>
+  </cac:LegalMonetaryTotal>
+</Invoice>
+"""
+
+
+class FakePage(object):
+
+    def __init__(self, text):
+        self.text = text
+
+    def extract_text(self):
+        return self.text
+
+
+class FakeReader(object):
+
+    def __init__(self, texts):
+        self.pages = [FakePage(text) for text in texts]
+
+
+class TestPdfData(BaseCase):
+
+    def test_xml_kind(self):
+        self.assertEqual(pdf_data.xml_kind(CII), 'facturx')
+        self.assertEqual(pdf_data.xml_kind(UBL), 'ubl')
+        self.assertIsNone(pdf_data.xml_kind(b'<Invoice/>'), 'an Invoice outside the UBL namespace')
+        self.assertIsNone(pdf_data.xml_kind(b'not xml'))
+
+    def test_parse_cii(self):
+        result = pdf_data.parse_invoice_xml(CII)
+        self.assertEqual(result['invoice'], {
+            'ref': 'FT 2024/17',
+            'invoice_date': '2024-01-15',
+            'invoice_date_due': '2024-02-14',
+            'currency': 'EUR',
+            'partner': {'name': 'Acme, Lda.', 'vat': 'PT501964843'},
+        })
+        self.assertEqual(result['lines'], [
+            {'name': 'Paper', 'quantity': 10.0, 'price_unit': 4.5, 'taxes': [{'amount': 23.0}]},
+        ])
+        self.assertTrue(pdf_data.is_complete(result))
+
+    def test_parse_ubl(self):
+        result = pdf_data.parse_invoice_xml(UBL)
+        self.assertEqual(result['invoice']['ref'], 'INV-9')
+        self.assertEqual(result['invoice']['invoice_date_due'], '2024-03-31')
+        self.assertEqual(result['invoice']['partner'], {'name': 'Globex', 'vat': 'US123'})
+        self.assertEqual(result['lines'], [{'name': 'Consulting', 'quantity': 2.0, 'price_unit': 100.0, 'taxes': []}])
+        self.assertTrue(pdf_data.is_complete(result))
+
+    def test_incomplete_invoice(self):
+        result = pdf_data.parse_invoice_xml(UBL.replace(b'<cbc:DocumentCurrencyCode>USD</cbc:DocumentCurrencyCode>', b''))
+        self.assertFalse(pdf_data.is_complete(result), 'no currency')
+        self.assertFalse(pdf_data.is_complete(None))
+
+    def test_base_quantity(self):
+        # 10 units at 450 per 100 units
+        xml = CII.replace(b'<ram:ChargeAmount>4.50</ram:ChargeAmount>',
+                          b'<ram:ChargeAmount>450</ram:ChargeAmount><ram:BasisQuantity unitCode="C62">100</ram:BasisQuantity>')
+        result = pdf_data.parse_invoice_xml(xml)
+        self.assertEqual(result['lines'][0]['price_unit'], 4.5)
+        self.assertTrue(pdf_data.is_complete(result))
+
+        xml = UBL.replace(b'<cbc:PriceAmount currencyID="USD">100</cbc:PriceAmount>',
+                          b'<cbc:PriceAmount currencyID="USD">1000</cbc:PriceAmount><cbc:BaseQuantity>10</cbc:BaseQuantity>')
+        self.assertEqual(pdf_data.parse_invoice_xml(xml)['lines'][0]['price_unit'], 100.0)
+
+    def test_zero_quantity_is_kept(self):
+        xml = UBL.replace(b'<cbc:InvoicedQuantity unitCode="C62">2</cbc:InvoicedQuantity>',
+                          b'<cbc:InvoicedQuantity unitCode="C62">0</cbc:InvoicedQuantity>')
+        result = pdf_data.parse_invoice_xml(xml)
+        self.assertEqual(result['lines'][0]['quantity'], 0.0)
+        self.assertFalse(pdf_data.is_complete(result), 'the line no longer adds up to the total')
+
+    def test_totals_must_match(self):
+        # A line allowance lowers the line total below quantity * price
+        xml = CII.replace(b'<ram:LineTotalAmount>45.00</ram:LineTotalAmount>', b'<ram:LineTotalAmount>40.50</ram:LineTotalAmount>')
+        self.assertFalse(pdf_data.is_complete(pdf_data.parse_invoice_xml(xml)))
+        # A document allowance lowers the tax basis below the line total
+        xml = UBL.replace(b'<cbc:TaxExclusiveAmount currencyID="USD">200</cbc:TaxExclusiveAmount>',
+                          b'<cbc:TaxExclusiveAmount currencyID="USD">180</cbc:TaxExclusiveAmount>')
+        self.assertFalse(pdf_data.is_complete(pdf_data.parse_invoice_xml(xml)))
+        # No totals to check the lines against
+        xml = UBL.replace(b'<cbc:LineExtensionAmount currencyID="USD">200</cbc:LineExtensionAmount>', b'')
+        self.assertFalse(pdf_data.is_complete(pdf_data.parse_invoice_xml(xml)))
+
+    def test_entities_are_not_expanded(self):
+        xml = b"""<?xml version="1.0"?>
+<!DOCTYPE Invoice [<!ENTITY secret SYSTEM "file:///etc/passwd">]>
+<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"
+    xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2"><cbc:ID>&secret;</cbc:ID></Invoice>
+"""
+        result = pdf_data.parse_invoice_xml(xml)
+        self.assertFalse(result and result['invoice']['ref'])
+
+    def test_text_layer(self):
+        text = 'Invoice FT 2024/17 ' * 10
+        self.assertEqual(pdf_data.text_layer(FakeReader([text, text])), f'{text}\n\f{text}'.strip())
+        self.assertIsNone(pdf_data.text_layer(FakeReader([text, ''])), 'a scanned page lowers the average')
+        self.assertIsNone(pdf_data.text_layer(FakeReader([])))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import BaseCase
+
+from odoo.addons.ssp_connector.tools import ssp_results
+
+
+class TestSspResults(BaseCase):
+
+    def test_rejects_entries_without_bill(self):
+        for entry in (None, 'x', [], {}, {'move_id': 'abc'}, {'move_id': -3}, {'move_id': True}, {'document_id': ''}):
+            self.assertIsNone(ssp_results.clean(entry), entry)
+
+    def test_document_only_entry(self):
+        result = ssp_results.clean({'document_id': 42})
+        self.assertEqual(result['document_id'], '42')
+        self.assertIsNone(result['move_id'])
+
+    def test_malformed_parts_are_dropped(self):
+        result = ssp_results.clean({
+            'move_id': '5',
+            'confidence': 'high',
+            'invoice': None,
+            'lines': [
+                'not a line',
+                {'name': ' Paper ', 'quantity': 'two', 'price_unit': '3.5',
+                 'taxes': [{}, {'amount': 'x'}, {'amount': '23'}, 7]},
+            ],
+        })
+        self.assertEqual(result['move_id'], 5)
+        self.assertIsNone(result['confidence'])
+        self.assertEqual(result['invoice'], {
+            'ref': None, 'currency': None, 'invoice_date': None, 'invoice_date_due': None, 'partner': {},
+        })
+        self.assertEqual(result['lines'], [
+            {'name': 'Paper', 'quantity': 1.0, 'price_unit': 3.5, 'taxes': [{'amount': 23.0}]},
+        ])
+
+    def test_invoice_values(self):
+        result = ssp_results.clean({
+            'move_id': 5,
+            'confidence': 1.7,
+            'invoice': {
+                'ref': 12,
+                'invoice_date': '2024-02-30',
+                'invoice_date_due': '2024-03-31T00:00:00Z',
+                'currency': ' EUR ',
+                'partner': {'name': 'Acme', 'vat': None},
+            },
+            'lines': {'not': 'a list'},
+        })
+        self.assertEqual(result['confidence'], 1.0)
+        self.assertEqual(result['invoice']['ref'], '12')
+        self.assertIsNone(result['invoice']['invoice_date'], 'impossible dates are dropped')
+        self.assertEqual(result['invoice']['invoice_date_due'], '2024-03-31')
+        self.assertEqual(result['invoice']['currency'], 'EUR')
+        self.assertEqual(result['invoice']['partner'], {'name': 'Acme', 'vat': None})
+        self.assertEqual(result['lines'], [])
+
+    def test_idempotent(self):
+        result = ssp_results.clean({'move_id': 5, 'invoice': {'ref': 'A1'}, 'lines': [{'price_unit': 2}]})
+        self.assertEqual(ssp_results.clean(result), result)
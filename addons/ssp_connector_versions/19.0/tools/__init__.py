@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+from . import ssp_client
+from . import metrics
+from . import image_prep
+from . import multipart
+from . import partner_keys
+from . import pdf_data
+from . import sso_token
+from . import ssp_results
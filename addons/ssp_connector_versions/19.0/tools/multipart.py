@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import uuid
+import zlib
+
+# Bytes read from disk (and handed to the socket) at a time
+CHUNK_SIZE = 64 * 1024
+
+
+class MultipartStream(object):
+    """multipart/form-data request body streamed from file objects
+
+    ``fields`` is a list of ``(name, value)`` text parts and ``files`` a list
+    of ``(name, filename, open_file, size, content_type)`` where ``open_file``
+    returns a new binary file object each time it is called. Only one chunk
+    is held in memory at a time, whatever the size of the files.
+
+    The body can be iterated several times (e.g. when a connection error is
+    retried). Without compression its length is known upfront and sent as
+    Content-Length; with ``gzip=True`` the body is compressed on the fly and
+    sent with chunked transfer encoding.
+    """
+
+    def __init__(self, fields, files, chunk_size=CHUNK_SIZE, gzip=False):
+        self.fields = fields
+        self.files = files
+        self.chunk_size = chunk_size
+        self.gzip = gzip
+        self.boundary = uuid.uuid4().hex
+
+    @property
+    def headers(self):
+        headers = {'Content-Type': f'multipart/form-data; boundary={self.boundary}'}
+        if self.gzip:
+            headers['Content-Encoding'] = 'gzip'
+        return headers
+
+    def _field_header(self, name):
+        return (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+        ).encode()
+
+    def _file_header(self, name, filename, content_type):
+        return (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{_quote(name)}"; filename="{_quote(filename)}"\r\n'
+            f'Content-Type: {content_type or "application/octet-stream"}\r\n\r\n'
+        ).encode()
+
+    def _closing(self):
+        return f'--{self.boundary}--\r\n'.encode()
+
+    def __len__(self):
+        # 0 makes requests fall back to chunked transfer encoding
+        if self.gzip:
+            return 0
+        length = len(self._closing())
+        for name, value in self.fields:
+            length += len(self._field_header(name)) + len(value.encode()) + 2
+        for name, filename, _open_file, size, content_type in self.files:
+            length += len(self._file_header(name, filename, content_type)) + size + 2
+        return length
+
+    def _iter_raw(self):
+        for name, value in self.fields:
+            yield self._field_header(name) + value.encode() + b'\r\n'
+        for name, filename, open_file, _size, content_type in self.files:
+            yield self._file_header(name, filename, content_type)
+            with open_file() as fileobj:
+                while True:
+                    chunk = fileobj.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            yield b'\r\n'
+        yield self._closing()
+
+    def __iter__(self):
+        if not self.gzip:
+            yield from self._iter_raw()
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in self._iter_raw():
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+
+def _quote(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\r', ' ').replace('\n', ' ')
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""Reads the data born-digital PDFs already carry: embedded e-invoice XML and text layer"""
+import logging
+from datetime import datetime
+
+from lxml import etree
+
+from odoo.tools.pdf import OdooPdfFileReader
+
+_logger = logging.getLogger(__name__)
+
+# Below this many characters per page the text layer is considered missing (scans)
+MIN_TEXT_PER_PAGE = 100
+# Pages read for the text layer; invoices longer than this go through OCR anyway
+MAX_TEXT_PAGES = 20
+# Difference allowed per line between the parsed lines and the document
+# totals, for amounts rounded line by line
+ROUNDING_TOLERANCE = 0.01
+
+
+def read(open_file):
+    """Returns (kind, content, result) for a PDF, or None when it has to be OCRed
+
+    ``kind`` is 'facturx' or 'ubl' for an embedded e-invoice (``result``
+    being the parsed invoice, in the SSP result format, or None if it could
+    not be parsed), or 'text' for a text layer (``result`` is None).
+    ``content`` is the XML or UTF-8 text.
+    """
+    try:
+        with open_file() as f:
+            reader = OdooPdfFileReader(f, strict=False)
+            for _name, content in reader.getAttachments():
+                kind = xml_kind(content)
+                if kind:
+                    return kind, content, parse_invoice_xml(content)
+            text = text_layer(reader)
+            if text:
+                return 'text', text.encode(), None
+    except Exception as e:
+        _logger.debug(f'Unreadable PDF, sent for OCR: {str(e)}')
+    return None
+
+
+def xml_kind(content):
+    try:
+        root = _parse_xml(content)
+    except (etree.XMLSyntaxError, ValueError):
+        return None
+    name = etree.QName(root).localname
+    if name == 'CrossIndustryInvoice':
+        return 'facturx'
+    if name in ('Invoice', 'CreditNote') and 'ubl' in (etree.QName(root).namespace or '').lower():
+        return 'ubl'
+    return None
+
+
+def text_layer(reader):
+    pages = reader.pages[:MAX_TEXT_PAGES] if hasattr(reader, 'pages') else [
+        reader.getPage(i) for i in range(min(reader.getNumPages(), MAX_TEXT_PAGES))
+    ]
+    if not pages:
+        return None
+    texts = []
+    for page in pages:
+        extract = getattr(page, 'extract_text', None) or page.extractText
+        texts.append(extract() or '')
+    text = '\n\f'.join(texts).strip()
+    return text if len(text) >= MIN_TEXT_PER_PAGE * len(pages) else None
+
+
+def _parse_xml(content):
+    # Embedded XML comes from third parties: no entity expansion, no network
+    # access. Parsers are not shared between threads, hence one per call.
+    return etree.fromstring(content, etree.XMLParser(resolve_entities=False, no_network=True))
+
+
+def is_complete(result):
+    """True when a parsed e-invoice carries everything needed to encode the bill
+
+    The lines must add up to the totals of the document: allowances,
+    charges or prices the parser does not read make them differ, and such
+    invoices are left to SSP.
+    """
+    if not result:
+        return False
+    invoice = result['invoice']
+    lines = result['lines']
+    if not (
+        invoice.get('ref') and invoice.get('invoice_date') and invoice.get('currency')
+        and (invoice['partner'].get('vat') or invoice['partner'].get('name'))
+        and lines and all(line.get('price_unit') is not None for line in lines)
+    ):
+        return False
+    totals = result.get('totals') or {}
+    if totals.get('lines') is None or totals.get('untaxed') is None:
+        return False
+    tolerance = ROUNDING_TOLERANCE * len(lines)
+    return (
+        abs(sum(line['quantity'] * line['price_unit'] for line in lines) - totals['lines']) <= tolerance
+        and abs(totals['lines'] - totals['untaxed']) <= tolerance
+    )
+
+
+def parse_invoice_xml(content):
+    """Parses a Factur-X/ZUGFeRD (CII) or UBL invoice into the SSP result format, or None"""
+    try:
+        root = _parse_xml(content)
+        if etree.QName(root).localname == 'CrossIndustryInvoice':
+            return _parse_cii(root)
+        return _parse_ubl(root)
+    except Exception as e:
+        _logger.debug(f'Embedded invoice XML could not be parsed: {str(e)}')
+        return None
+
+
+def _text(node, path):
+    found = node.find(path) if node is not None else None
+    return found.text.strip() if found is not None and found.text else None
+
+
+def _number(node, path):
+    value = _text(node, path)
+    return float(value) if value is not None else None
+
+
+def _first(*values):
+    """Returns the first value that is not None; an explicit 0 is kept"""
+    return next((value for value in values if value is not None), None)
+
+
+def _unit_price(price, base_quantity):
+    """Price of one unit, for prices given per ``base_quantity`` units (e.g. per 100)"""
+    if price is None or not base_quantity:
+        return price
+    return price / base_quantity
+
+
+def _cii_date(node, path):
+    value = _text(node, path)
+    return datetime.strptime(value, '%Y%m%d').date().isoformat() if value else None
+
+
+def _parse_cii(root):
+    seller = root.find('.//{*}SellerTradeParty')
+    vat = None
+    for registration in seller.findall('{*}SpecifiedTaxRegistration/{*}ID') if seller is not None else []:
+        if registration.get('schemeID') == 'VA':
+            vat = registration.text.strip()
+    lines = []
+    for item in root.iterfind('.//{*}IncludedSupplyChainTradeLineItem'):
+        rate = _number(item, '{*}SpecifiedLineTradeSettlement/{*}ApplicableTradeTax/{*}RateApplicablePercent')
+        price = item.find('{*}SpecifiedLineTradeAgreement/{*}NetPriceProductTradePrice')
+        lines.append({
+            'name': _text(item, '{*}SpecifiedTradeProduct/{*}Name'),
+            'quantity': _first(_number(item, '{*}SpecifiedLineTradeDelivery/{*}BilledQuantity'), 1.0),
+            'price_unit': _unit_price(_number(price, '{*}ChargeAmount'), _number(price, '{*}BasisQuantity')),
+            'taxes': [{'amount': rate}] if rate is not None else [],
+        })
+    summation = root.find('.//{*}ApplicableHeaderTradeSettlement/{*}SpecifiedTradeSettlementHeaderMonetarySummation')
+    return {
+        'invoice': {
+            'ref': _text(root, '{*}ExchangedDocument/{*}ID'),
+            'invoice_date': _cii_date(root, '{*}ExchangedDocument/{*}IssueDateTime/{*}DateTimeString'),
+            'invoice_date_due': _cii_date(root, './/{*}SpecifiedTradePaymentTerms/{*}DueDateDateTime/{*}DateTimeString'),
+            'currency': _text(root, './/{*}InvoiceCurrencyCode'),
+            'partner': {'name': _text(seller, '{*}Name'), 'vat': vat},
+        },
+        'lines': lines,
+        'totals': {
+            'lines': _number(summation, '{*}LineTotalAmount'),
+            'untaxed': _number(summation, '{*}TaxBasisTotalAmount'),
+        },
+    }
+
+
+def _parse_ubl(root):
+    party = root.find('{*}AccountingSupplierParty/{*}Party')
+    lines = []
+    for item in root.iterfind('{*}InvoiceLine') if etree.QName(root).localname == 'Invoice' else root.iterfind('{*}CreditNoteLine'):
+        rate = _number(item, '{*}Item/{*}ClassifiedTaxCategory/{*}Percent')
+        lines.append({
+            'name': _text(item, '{*}Item/{*}Name') or _text(item, '{*}Item/{*}Description'),
+            'quantity': _first(_number(item, '{*}InvoicedQuantity'), _number(item, '{*}CreditedQuantity'), 1.0),
+            'price_unit': _unit_price(_number(item, '{*}Price/{*}PriceAmount'), _number(item, '{*}Price/{*}BaseQuantity')),
+            'taxes': [{'amount': rate}] if rate is not None else [],
+        })
+    monetary_total = root.find('{*}LegalMonetaryTotal')
+    return {
+        'invoice': {
+            'ref': _text(root, '{*}ID'),
+            'invoice_date': _text(root, '{*}IssueDate'),
+            'invoice_date_due': _text(root, '{*}DueDate') or _text(root, '{*}PaymentMeans/{*}PaymentDueDate'),
+            'currency': _text(root, '{*}DocumentCurrencyCode'),
+            'partner': {
+                'name': _text(party, '{*}PartyLegalEntity/{*}RegistrationName') or _text(party, '{*}PartyName/{*}Name'),
+                'vat': _text(party, '{*}PartyTaxScheme/{*}CompanyID'),
+            },
+        },
+        'lines': lines,
+        'totals': {
+            'lines': _number(monetary_total, '{*}LineExtensionAmount'),
+            'untaxed': _number(monetary_total, '{*}TaxExclusiveAmount'),
+        },
+    }
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+
+VERSION = 'v1'
+
+# Default token lifetime, in seconds
+DEFAULT_TTL = 120
+
+_lock = threading.Lock()
+# {cache key: (token, monotonic time after which it is not handed out anymore)}
+_cache = {}
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _sign(secret, message):
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).digest()
+
+
+def mint(secret, claims, ttl=DEFAULT_TTL):
+    """Returns a signed ``v1.<payload>.<signature>`` token valid for ``ttl`` seconds
+
+    The payload is the JSON of ``claims`` plus ``iat``, ``exp`` and a random
+    ``nonce``; the signature is HMAC-SHA256 keyed with the shared secret, so
+    the platform validates it without calling back.
+    """
+    now = int(time.time())
+    payload = dict(claims, iat=now, exp=now + ttl, nonce=secrets.token_urlsafe(12))
+    body = _b64encode(json.dumps(payload, separators=(',', ':'), sort_keys=True).encode())
+    message = f'{VERSION}.{body}'
+    return f'{message}.{_b64encode(_sign(secret, message))}'
+
+
+def get_or_mint(key, secret, claims, ttl=DEFAULT_TTL):
+    """Returns a cached token for ``key`` while it has at least half its lifetime left"""
+    fingerprint = hashlib.sha256(secret.encode()).hexdigest()[:16]
+    cache_key = (key, fingerprint)
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(cache_key)
+        if cached and cached[1] > now:
+            return cached[0]
+        token = mint(secret, claims, ttl)
+        # Drop expired entries so the cache stays bounded by the active users
+        for stale in [k for k, (_t, until) in _cache.items() if until <= now]:
+            del _cache[stale]
+        _cache[cache_key] = (token, now + ttl / 2)
+        return token
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Validates the extraction results SSP sends before they reach the ORM"""
+from datetime import date
+
+INVOICE_TEXT = ('ref', 'currency')
+INVOICE_DATES = ('invoice_date', 'invoice_date_due')
+
+
+def clean(result):
+    """Returns ``result`` normalized to the shape the connector relies on, or None
+
+    Entries that are not objects or do not name a bill (move_id or
+    document_id) are rejected. Malformed optional parts are dropped one by
+    one: an ``invoice`` or ``partner`` that is not an object becomes {}, a
+    bad date or amount becomes None, lines and taxes that cannot be used are
+    left out. One bad value never costs the rest of the batch.
+    """
+    if not isinstance(result, dict):
+        return None
+    move_id = _integer(result.get('move_id'))
+    document_id = result.get('document_id')
+    document_id = str(document_id) if isinstance(document_id, (str, int)) and document_id != '' else None
+    if not move_id and not document_id:
+        return None
+    cleaned = dict(result, move_id=move_id, document_id=document_id)
+
+    confidence = _number(result.get('confidence'))
+    cleaned['confidence'] = min(max(confidence, 0.0), 1.0) if confidence is not None else None
+
+    invoice = result.get('invoice') if isinstance(result.get('invoice'), dict) else {}
+    invoice = dict(invoice)
+    for key in INVOICE_TEXT:
+        invoice[key] = _text(invoice.get(key))
+    for key in INVOICE_DATES:
+        invoice[key] = _date(invoice.get(key))
+    partner = invoice.get('partner') if isinstance(invoice.get('partner'), dict) else {}
+    invoice['partner'] = {key: _text(value) for key, value in partner.items()}
+    cleaned['invoice'] = invoice
+
+    lines = result.get('lines') if isinstance(result.get('lines'), list) else []
+    cleaned['lines'] = [line for line in map(_line, lines) if line]
+    return cleaned
+
+
+def _line(line):
+    if not isinstance(line, dict):
+        return None
+    taxes = line.get('taxes') if isinstance(line.get('taxes'), list) else []
+    quantity = _number(line.get('quantity'))
+    price_unit = _number(line.get('price_unit'))
+    return {
+        'name': _text(line.get('name')),
+        'quantity': quantity if quantity is not None else 1.0,
+        'price_unit': price_unit if price_unit is not None else 0.0,
+        'taxes': [
+            {'amount': amount} for amount in (
+                _number(tax.get('amount')) for tax in taxes if isinstance(tax, dict)
+            ) if amount is not None
+        ],
+    }
+
+
+def _integer(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value > 0 else None
+    if isinstance(value, str) and value.isdigit():
+        return int(value) or None
+    return None
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if number == number and abs(number) != float('inf') else None
+
+
+def _text(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        return None
+    return value.strip() or None
+
+
+def _date(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value.strip()[:10]).isoformat()
+    except ValueError:
+        return None
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Connector benchmark scenarios, executed inside ``odoo shell``
+
+Reads its parameters from the environment:
+
+    SSP_BENCH_URL     platform URL of the stub, as reachable from Odoo
+    SSP_BENCH_BILLS   number of vendor bills created for the run (default 500)
+    SSP_BENCH_BATCH   upload batch size (default 25)
+
+Prints one ``BENCH_RESULT {json}`` line per scenario. It commits, so it
+must run against a dedicated benchmark database with ssp_connector installed.
+"""
+import json
+import os
+import time
+
+import requests
+
+from odoo.addons.ssp_connector.models.ssp_sync import SYNC_SAFETY_LAG
+
+URL = os.environ.get('SSP_BENCH_URL', 'http://localhost:8765')
+BILLS = int(os.environ.get('SSP_BENCH_BILLS', 500))
+BATCH = int(os.environ.get('SSP_BENCH_BATCH', 25))
+VERSION = env['ir.module.module'].sudo().search([('name', '=', 'base')]).latest_version  # noqa: F821
+
+PDF = b'%%PDF-1.4\n1 0 obj<<>>endobj\n%% bench %d\ntrailer<<>>\n%%%%EOF\n'
+
+
+def report(scenario, seconds, items, **extra):
+    print('BENCH_RESULT ' + json.dumps(dict({
+        'odoo_version': VERSION,
+        'scenario': scenario,
+        'items': items,
+        'seconds': round(seconds, 4),
+        'items_per_second': round(items / seconds, 2) if seconds else None,
+    }, **extra)), flush=True)
+
+
+def drain(env):
+    """Runs the outbox worker until nothing is due; returns messages left pending"""
+    Outbox = env['ssp.outbox'].sudo()
+    while Outbox.search_count([('state', '=', 'pending'), ('next_attempt', '<=', fields_now(env))]):
+        Outbox._cron_process()
+    return Outbox.search_count([('state', 'in', ('pending', 'running'))])
+
+
+def fields_now(env):
+    env.cr.execute("SELECT now() at time zone 'UTC'")
+    return env.cr.fetchone()[0]
+
+
+def run(env):
+    env = env(su=True)
+    company = env.company
+    Config = env['ssp.config']
+
+    # Registration: create() must return fast, the call itself goes through the outbox
+    Config.search([('company_id', '=', company.id)]).unlink()
+    env['ssp.outbox'].search([]).unlink()
+    env.cr.commit()
+    started = time.perf_counter()
+    config = Config.create({'admin_email': 'bench@example.com', 'platform_url': URL, 'submit_batch_size': BATCH})
+    env.cr.commit()
+    report('registration_create', time.perf_counter() - started, 1)
+    started = time.perf_counter()
+    left = drain(env)
+    config.invalidate_recordset()
+    report('registration_end_to_end', time.perf_counter() - started, 1, state=config.state, pending=left)
+
+    # Bulk submission of draft vendor bills with distinct PDFs
+    partner = env['res.partner'].create({'name': 'Benchmark Supplier', 'vat': 'PT999999990', 'is_company': True})
+    moves = env['account.move'].create([{
+        'move_type': 'in_invoice',
+        'partner_id': partner.id,
+    } for _i in range(BILLS)])
+    attachments = env['ir.attachment'].create([{
+        'name': f'bill_{move.id}.pdf',
+        'raw': PDF % move.id,
+        'mimetype': 'application/pdf',
+        'res_model': 'account.move',
+        'res_id': move.id,
+    } for move in moves])
+    env.cr.commit()
+    started = time.perf_counter()
+    moves._ssp_submit()
+    env.cr.commit()
+    left = drain(env)
+    moves.invalidate_recordset()
+    report('bulk_submission', time.perf_counter() - started, BILLS, batch_size=BATCH, pending=left,
+           submitted=len(moves.filtered(lambda m: m.ssp_state == 'submitted')))
+
+    # Delta synchronization of everything written since registration. A pass
+    # stops SYNC_SAFETY_LAG before the database clock: age the run's records
+    # and last_sync past it, as if the pass ran after the lag
+    age = SYNC_SAFETY_LAG + 60
+    for table, ids in (('account_move', moves.ids), ('ir_attachment', attachments.ids), ('res_partner', partner.ids)):
+        env.cr.execute(f"UPDATE {table} SET write_date = write_date - make_interval(secs => %s) WHERE id = ANY(%s)",
+                       [age, ids])
+    env.cr.execute("""
+        UPDATE ssp_config SET last_sync = (now() at time zone 'UTC') - make_interval(secs => %s), sync_cursor = NULL
+         WHERE id = %s
+    """, [age + 3600, config.id])
+    env.cr.commit()
+    env.invalidate_all()
+    last_message = env['ssp.outbox'].search([], order='id desc', limit=1).id or 0
+    started = time.perf_counter()
+    config._ssp_delta_sync()
+    pages = env['ssp.outbox'].search_count([('operation', '=', 'sync'), ('id', '>', last_message)])
+    left = drain(env)
+    report('delta_sync', time.perf_counter() - started, pages, unit='pages', pending=left)
+
+    # Applying extraction results, as pushed by the webhook
+    refs = [ref for ref in moves.mapped('ssp_document_ref') if ref]
+    results = []
+    for i in range(0, len(refs), 100):
+        response = requests.get(f'{URL}/api/odoo/results', params={'document_id': refs[i:i + 100]}, timeout=30)
+        results += response.json()['results']
+    started = time.perf_counter()
+    applied = 0
+    for i in range(0, len(results), 100):
+        applied += len(env['account.move'].with_company(company)._ssp_apply_results(config, results[i:i + 100]))
+        env.cr.commit()
+    report('webhook_apply', time.perf_counter() - started, applied, batch_size=100)
+
+
+run(env)  # noqa: F821
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Runs the connector benchmark against each ssp_connector_versions tree
+
+For every requested Odoo version the matching tree is copied to
+addons/ssp_connector, the module is installed (or updated) in a database of
+that version, ``<db>-<version>``, and bench/odoo_bench.py is executed in
+``odoo shell`` while a local SSP stub serves the platform API. A database is
+never shared between versions: Odoo cannot open one created by another
+major version. Results are written as JSON lines.
+
+Example (containers created by ``make create-odoo-container``):
+
+    python3 bench/run.py --versions 17 18 19 --db ssp-bench \\
+        --odoo-cmd "docker exec -i odoo{version} odoo --db_host=db --db_user=odoo --db_password=odoo" \\
+        --platform-url http://172.17.0.1:8765 --output bench_output.jsonl
+"""
+import argparse
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+import ssp_stub  # noqa: E402
+
+VERSIONS_PATH = os.path.join(ROOT, 'addons', 'ssp_connector_versions')
+MODULE_PATH = os.path.join(ROOT, 'addons', 'ssp_connector')
+
+
+def switch_version(version):
+    source = os.path.join(VERSIONS_PATH, f'{version}.0')
+    if not os.path.isdir(source):
+        raise SystemExit(f'No connector tree for Odoo {version} in {VERSIONS_PATH}')
+    shutil.rmtree(MODULE_PATH, ignore_errors=True)
+    shutil.copytree(source, MODULE_PATH, ignore=shutil.ignore_patterns('__pycache__'))
+
+
+def run_version(args, version):
+    odoo = shlex.split(args.odoo_cmd.format(version=version))
+    db = f'{args.db}-{version}'
+    switch_version(version)
+    # -i creates the database and installs the module the first time, -u updates it afterwards
+    subprocess.run(odoo + ['-d', db, '-i', 'ssp_connector', '-u', 'ssp_connector', '--stop-after-init', '--no-http'],
+                   check=True, stdout=subprocess.DEVNULL)
+
+    env = dict(os.environ, SSP_BENCH_URL=args.platform_url, SSP_BENCH_BILLS=str(args.bills),
+               SSP_BENCH_BATCH=str(args.batch))
+    # docker exec does not forward the environment: prepend the assignments to the script
+    script = ''.join(
+        f'import os; os.environ[{key!r}] = {env[key]!r}\n'
+        for key in ('SSP_BENCH_URL', 'SSP_BENCH_BILLS', 'SSP_BENCH_BATCH')
+    )
+    with open(os.path.join(HERE, 'odoo_bench.py')) as f:
+        script += f.read()
+    process = subprocess.run(odoo + ['shell', '-d', db, '--no-http'], input=script,
+                             capture_output=True, text=True, env=env)
+    results = [json.loads(line[len('BENCH_RESULT '):]) for line in process.stdout.splitlines()
+               if line.startswith('BENCH_RESULT ')]
+    if process.returncode or not results:
+        sys.stderr.write(process.stderr[-4000:])
+        raise SystemExit(f'Benchmark failed for Odoo {version}')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SSP connector benchmark')
+    parser.add_argument('--versions', nargs='+', default=['17', '18', '19'])
+    parser.add_argument('--db', default='ssp-bench', help='database name prefix; one database per version')
+    parser.add_argument('--odoo-cmd', default='docker exec -i odoo{version} odoo',
+                        help='command running odoo-bin for a version; {version} is substituted')
+    parser.add_argument('--platform-url', default='http://172.17.0.1:8765',
+                        help='stub URL as reachable from the Odoo process')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--bills', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=25)
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'bench_output.jsonl'))
+    args = parser.parse_args()
+
+    server = ssp_stub.serve(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            error_rate=args.error_rate)
+    run_id = time.strftime('%Y%m%dT%H%M%S')
+    try:
+        with open(args.output, 'a') as output:
+            for version in args.versions:
+                for result in run_version(args, version):
+                    result.update(run_id=run_id, connector_tree=f'{version}.0', bills=args.bills,
+                                  stub_latency_ms=args.latency_ms, stub_error_rate=args.error_rate)
+                    output.write(json.dumps(result) + '\n')
+                    print(json.dumps(result))
+        with urllib.request.urlopen(f'http://127.0.0.1:{args.port}/__stats') as response:
+            print(json.dumps({'run_id': run_id, 'stub_stats': json.load(response)}))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Local stand-in for the Smart Solutions Platform API, for benchmarks
+
+Implements the endpoints used by the connector with configurable latency
+and error injection:
+
+    POST /api/odoo/register          registration
+    POST /api/odoo/invoices/upload   batched multipart upload (gzip/chunked aware)
+    POST /api/odoo/sync              delta synchronization pages
+    POST /api/odoo/history           gzipped JSONL vendor bill history chunks
+    POST /api/odoo/uploads           opens a resumable upload
+    GET  /api/odoo/uploads/<id>      acknowledged offset of a resumable upload
+    PUT  /api/odoo/uploads/<id>      one checksummed chunk (Upload-Offset/Upload-Checksum)
+    GET  /api/odoo/results           synthetic extraction results (?document_id=..)
+    GET  /__stats                    request counters of the stub itself
+
+Usage: python3 bench/ssp_stub.py --port 8765 --latency-ms 40 --error-rate 0.02
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubState(object):
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.documents = {}
+        self.uploads = {}
+
+    def count(self, key, value=1):
+        with self.lock:
+            self.counters[key] += value
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- helpers ---------------------------------------------------------
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if not size:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            body = b''.join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        self.state.count('bytes_in', len(body))
+        return body
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject(self):
+        """Applies the configured latency; returns True when an error was injected"""
+        state = self.state
+        delay = state.latency_ms + random.uniform(-state.jitter_ms, state.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if state.error_rate and random.random() < state.error_rate:
+            state.count('errors_injected')
+            self._send_json(state.error_status, {'success': False, 'message': 'injected error'})
+            return True
+        return False
+
+    # -- routes ----------------------------------------------------------
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.state.count(f'GET {url.path}')
+        if url.path == '/__stats':
+            with self.state.lock:
+                return self._send_json(200, dict(self.state.counters))
+        if self._inject():
+            return
+        if url.path.startswith('/api/odoo/uploads/'):
+            with self.state.lock:
+                upload = self.state.uploads.get(url.path.rsplit('/', 1)[1])
+            if not upload:
+                return self._send_json(404, {'success': False, 'message': 'unknown upload'})
+            return self._send_json(200, {'offset': upload['offset'], 'size': upload['size']})
+        if url.path == '/api/odoo/results':
+            ids = parse_qs(url.query).get('document_id', [])
+            with self.state.lock:
+                documents = [(i, self.state.documents.get(i)) for i in ids]
+            return self._send_json(200, {'results': [
+                _fake_result(document_id, move_id) for document_id, move_id in documents if move_id
+            ]})
+        self._send_json(404, {'success': False, 'message': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.state.count(f'POST {url.path}')
+        body = self._read_body()
+        if self._inject():
+            return
+        if url.path == '/api/odoo/register':
+            return self._send_json(200, {
+                'success': True,
+                'account_id': random.randint(1000, 999999),
+                'sso_token': uuid.uuid4().hex,
+            })
+        if url.path == '/api/odoo/invoices/upload':
+            return self._send_json(200, {'results': self._accept_upload(body)})
+        if url.path == '/api/odoo/sync':
+            records = json.loads(body or b'{}').get('records', [])
+            self.state.count('records_synced', len(records))
+            return self._send_json(200, {'success': True, 'received': len(records)})
+        if url.path == '/api/odoo/uploads':
+            upload_id = uuid.uuid4().hex
+            with self.state.lock:
+                self.state.uploads[upload_id] = {'offset': 0, 'size': json.loads(body)['size']}
+            return self._send_json(200, {'upload_id': upload_id, 'offset': 0})
+        if url.path == '/api/odoo/history':
+            moves = [line for line in body.splitlines() if line.strip()]
+            self.state.count('history_moves', len(moves))
+            return self._send_json(200, {'success': True, 'received': len(moves)})
+        self._send_json(404, {'success': False, 'message': 'not found'})
+
+    def do_PUT(self):
+        url = urlparse(self.path)
+        self.state.count('PUT /api/odoo/uploads/:id')
+        body = self._read_body()
+        if self._inject():
+            return
+        with self.state.lock:
+            upload = self.state.uploads.get(url.path.rsplit('/', 1)[1])
+            if not upload or not url.path.startswith('/api/odoo/uploads/'):
+                return self._send_json(404, {'success': False, 'message': 'unknown upload'})
+            if int(self.headers.get('Upload-Offset', -1)) != upload['offset']:
+                return self._send_json(409, {'success': False, 'offset': upload['offset']})
+            expected = 'sha1 ' + base64.b64encode(hashlib.sha1(body).digest()).decode()
+            if self.headers.get('Upload-Checksum') != expected:
+                return self._send_json(460, {'success': False, 'message': 'checksum mismatch'})
+            upload['offset'] += len(body)
+            offset = upload['offset']
+        self.state.count('upload_chunks')
+        self._send_json(200, {'offset': offset})
+
+    def _accept_upload(self, body):
+        message = BytesParser().parsebytes(
+            b'Content-Type: ' + self.headers.get('Content-Type', '').encode() + b'\r\n\r\n' + body
+        )
+        manifest = []
+        files = 0
+        for part in message.get_payload() if message.is_multipart() else []:
+            name = part.get_param('name', header='content-disposition')
+            if name == 'manifest':
+                manifest = json.loads(part.get_payload(decode=True))
+            elif part.get_filename():
+                files += 1
+        self.state.count('documents_received', files)
+        results = []
+        with self.state.lock:
+            for entry in manifest:
+                document_id = uuid.uuid4().hex
+                self.state.documents[document_id] = entry['move_id']
+                results.append({'move_id': entry['move_id'], 'document_id': document_id, 'status': 'accepted'})
+        return results
+
+
+def _fake_result(document_id, move_id):
+    return {
+        'move_id': move_id,
+        'document_id': document_id,
+        'confidence': round(random.uniform(0.6, 0.99), 2),
+        'invoice': {
+            'ref': f'BENCH-{move_id}',
+            'invoice_date': time.strftime('%Y-%m-%d'),
+            'partner': {'name': 'Benchmark Supplier', 'vat': 'PT999999990'},
+        },
+        'lines': [
+            {'name': f'Item {i}', 'quantity': 1, 'price_unit': 10.0 * (i + 1), 'taxes': [{'amount': 23.0}]}
+            for i in range(3)
+        ],
+    }
+
+
+def serve(host='0.0.0.0', port=8765, **options):
+    """Starts the stub in a background thread and returns the server"""
+    handler = type('BoundStubHandler', (StubHandler,), {'state': StubState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args()
+    server = serve(args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                   error_rate=args.error_rate, error_status=args.error_status)
+    print(f'SSP stub listening on http://{args.host}:{args.port}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()